@@ -1,16 +1,57 @@
-import sys
+import functools
+import random
 import time
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
 import ib_insync as ib
+import numpy as np
 import pandas as pd
 from backtrader import CommInfoBase
 from ib_insync.order import UNSET_DOUBLE
 
 from ..model.models import Position
+from ..utils._njit import njit
 from .base import BrokerBase
 
 
+# No fastmath: min_size and cap_price are inf when the commission or the ratio is
+# zero, and fastmath lets LLVM assume there are no infinities
+@njit(cache=True)
+def _commission_scalar(
+    size, price, commission, min_commission, max_ratio, min_size, cap_price
+):
+    if size == 0:
+        return 0.0
+    abs_size = -size if size < 0 else size
+    if abs_size >= min_size:
+        # Per-share commission is above the minimum, so
+        # min(max(a*c, mn), a*p*r) reduces to a*p*r if p < c/r, else a*c.
+        if price < cap_price:
+            res = abs_size * price * max_ratio
+        else:
+            res = abs_size * commission
+    else:
+        res = min(min_commission, abs_size * price * max_ratio)
+    res += 0.000119 * abs_size
+    if size < 0:  # Sell
+        res += 0.0000221 * abs_size * price
+    return res
+
+
+# Trade type of an instrument -> InteractiveBrokers contract factory method
+_TRADE_TYPE_FACTORY = {
+    "SPOT": "makeStockContract",
+    "PERP": "makeFutureContract",
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_instrument(instrument: str) -> tuple[str, str, str]:
+    """Split "TICKER-CURRENCY-TYPE" into its upper-cased parts."""
+    symbol, currency, trade_type = instrument.upper().split("-")
+    return symbol, currency, trade_type
+
+
 class CommissionSchemeFixed(CommInfoBase):
     params = dict(
         commission=0.5,  # percentage
@@ -20,27 +61,76 @@ class CommissionSchemeFixed(CommInfoBase):
         maxCommissionRatio=0.01,
     )
 
+    def __init__(self):
+        super().__init__()
+        # Read after CommInfoBase has normalized the percentage commission
+        self._commission = self.p.commission
+        self._min_commission = self.p.minCommission
+        self._max_ratio = self.p.maxCommissionRatio
+        # Size above which size * commission exceeds the minimum commission, and
+        # price below which the maxCommissionRatio cap binds for such sizes
+        self._min_size = (
+            self._min_commission / self._commission
+            if self._commission > 0
+            else float("inf")
+        )
+        self._cap_price = (
+            self._commission / self._max_ratio if self._max_ratio > 0 else float("inf")
+        )
+
     def _getcommission(self, size, price, pseudoexec):
-        if size > 0:  # Buy
-            return (
-                min(
-                    max(size * self.p.commission, self.p.minCommission),
-                    size * price * self.p.maxCommissionRatio,
-                )
-                + 0.000119 * size
-            )
-        elif size < 0:  # Sell
-            size = abs(size)
-            return (
-                min(
-                    max(size * self.p.commission, self.p.minCommission),
-                    size * price * self.p.maxCommissionRatio,
-                )
-                + 0.000119 * size
-                + 0.0000221 * size * price
+        return _commission_scalar(
+            size,
+            price,
+            self._commission,
+            self._min_commission,
+            self._max_ratio,
+            self._min_size,
+            self._cap_price,
+        )
+
+    @classmethod
+    def batch_commission(
+        cls,
+        sizes: np.ndarray,
+        prices: np.ndarray,
+        commission: float | None = None,
+        min_commission: float | None = None,
+        max_ratio: float | None = None,
+    ) -> np.ndarray:
+        """
+        Vectorized version of _getcommission over arrays of trades.
+
+        Parameters:
+            sizes (np.ndarray): Signed trade sizes, positive for buys and negative for sells.
+            prices (np.ndarray): Execution prices, broadcastable against sizes.
+            commission (float, optional): Commission percentage, as in params.
+                Defaults to params.commission.
+            min_commission (float, optional): Defaults to params.minCommission.
+            max_ratio (float, optional): Defaults to params.maxCommissionRatio.
+
+        Returns:
+            np.ndarray: The commission of each trade, 0 where the size is 0.
+        """
+        p = cls.params
+        commission = p.commission if commission is None else commission
+        # Normalized like CommInfoBase.__init__ does for percentage commissions
+        if p.commtype == CommInfoBase.COMM_PERC and not p.percabs:
+            commission /= 100.0
+        min_commission = p.minCommission if min_commission is None else min_commission
+        max_ratio = p.maxCommissionRatio if max_ratio is None else max_ratio
+        sizes = np.asarray(sizes)
+        prices = np.asarray(prices)
+        abs_sizes = np.abs(sizes)
+        res = (
+            np.minimum(
+                np.maximum(abs_sizes * commission, min_commission),
+                abs_sizes * prices * max_ratio,
             )
-        else:
-            return 0  # If size == 0
+            + 0.000119 * abs_sizes
+        )
+        res += np.where(sizes < 0, 0.0000221 * abs_sizes * prices, 0.0)
+        return np.where(sizes == 0, 0.0, res)
 
 
 class CommissionSchemeTiered(CommInfoBase):
@@ -50,6 +140,38 @@ class CommissionSchemeTiered(CommInfoBase):
 class InteractiveBrokers(BrokerBase):
     _ib: ib.IB
     _account: str
+    _TRADE_INDEX_TTL: float = 0.05  # seconds
+    _ACCOUNT_SUMMARY_TTL: float = 0.25  # seconds
+    _PENDING_STATUSES = frozenset(
+        {
+            ib.OrderStatus.ApiPending,
+            ib.OrderStatus.PendingSubmit,
+            ib.OrderStatus.Inactive,
+        }
+    )
+    _SUBMITTED_STATUSES = frozenset(
+        {
+            ib.OrderStatus.Submitted,
+            ib.OrderStatus.PreSubmitted,
+        }
+    )
+    _CANCELLED_STATUSES = frozenset(
+        {
+            ib.OrderStatus.PendingCancel,
+            ib.OrderStatus.Cancelled,
+            ib.OrderStatus.ApiCancelled,
+        }
+    )
+    # Sizes fit in float32; prices and costs keep float64, since avg_cost feeds the
+    # stop-loss comparison
+    _POSITION_DTYPES = {
+        "position": np.float32,
+        "market_price": np.float64,
+        "avg_cost": np.float64,
+        "market_value": np.float64,
+        "unrealized_pnl": np.float64,
+        "realized_pnl": np.float64,
+    }
 
     def __init__(
         self,
@@ -66,8 +188,21 @@ class InteractiveBrokers(BrokerBase):
         self._account = account
 
         self.orderbyid: Dict[str, ib.Order] = dict()
+        # Signed quantities of placed orders for cheap numeric reads;
+        # _oid_index maps orderId to the row in _oid_qty.
+        self._oid_index: Dict[int, int] = dict()
+        self._oid_qty = np.empty(64, dtype=np.float32)
         self.positions: pd.DataFrame = pd.DataFrame()
         self.cash: float = 0
+        # (secType, symbol, exchange, currency) -> contract, reused across orders
+        self._contracts: Dict[tuple, ib.Contract] = dict()
+
+        # orderId -> Trade index, rebuilt at most once per tick
+        self._trade_index: Dict[int, ib.Trade] = dict()
+        self._trade_index_stamp: float = float("-inf")
+        # Summary of self._account, shared by getCash/getTotalValue within a tick
+        self._acct_cache: Optional[pd.DataFrame] = None
+        self._acct_stamp: float = float("-inf")
 
         self.start(**kwargs)
 
@@ -95,12 +230,15 @@ class InteractiveBrokers(BrokerBase):
             self._account = self._ib.managedAccounts()[0]
 
     def _connect(self, **kwargs) -> None:
+        # Exponential backoff with jitter: 0.05s, 0.1s, 0.2s, ...
+        delay = 0.05
         for i in range(5):
             try:
                 self._ib.connect(self._host, self._port, self._clientId, **kwargs)
                 return
             except Exception:
-                time.sleep(1)
+                time.sleep(delay + random.random() * 0.05)
+                delay *= 2
         raise Exception("Failed to connect to Interactive Brokers.")
 
     # def now(self) -> datetime.datetime:
@@ -111,8 +249,24 @@ class InteractiveBrokers(BrokerBase):
 
     def update(self) -> None:
         self.sleep(0)
-        self.cash = self.getCash()
-        self.positions = self.getPositionsDF()
+        self._invalidateTradeIndex()
+        self._acct_cache = None
+        # accountValues() and portfolio() both read the account-updates snapshot
+        # kept by ib_insync, so no extra accountSummary request is issued here
+        # One row per currency; BASE is the total in the base currency, as reported
+        # by accountSummary. Without an unambiguous row fall back to the summary
+        cash_rows = {
+            v.currency: v.value
+            for v in self._ib.accountValues(self._account)
+            if v.tag == "TotalCashValue"
+        }
+        if "BASE" in cash_rows:
+            self.cash = float(cash_rows["BASE"])
+        elif len(cash_rows) == 1:
+            self.cash = float(next(iter(cash_rows.values())))
+        else:
+            self.cash = self.getCash()
+        self.positions = self._portfolioToDF(self._ib.portfolio())
 
     def getCash(self) -> float:
         account_info = self.getAccountSummary()
@@ -127,19 +281,38 @@ class InteractiveBrokers(BrokerBase):
 
     def getAccountSummary(self, account: str = "") -> pd.DataFrame:
         if account == "":
-            return pd.DataFrame(self._ib.accountSummary(self._account)).set_index("tag")
+            now = time.monotonic()
+            if (
+                self._acct_cache is None
+                or now - self._acct_stamp >= self._ACCOUNT_SUMMARY_TTL
+            ):
+                self._acct_cache = pd.DataFrame(
+                    self._ib.accountSummary(self._account)
+                ).set_index("tag")
+                self._acct_stamp = now
+            return self._acct_cache
         elif account.lower() == "all":
             return pd.DataFrame(self._ib.accountSummary())
         else:
             return pd.DataFrame(self._ib.accountSummary(account)).set_index("tag")
 
     def makeStockContract(self, symbol: str, exchange: str, currency: str) -> ib.Stock:
-        return ib.Stock(symbol, exchange, currency)
+        key = ("STK", symbol, exchange, currency)
+        contract = self._contracts.get(key)
+        if contract is None:
+            contract = self._contracts[key] = ib.Stock(symbol, exchange, currency)
+        return contract
 
     def makeFutureContract(
         self, symbol: str, exchange: str, currency: str
     ) -> ib.Future:
-        return ib.Future(symbol, exchange=exchange, currency=currency)
+        key = ("FUT", symbol, exchange, currency)
+        contract = self._contracts.get(key)
+        if contract is None:
+            contract = self._contracts[key] = ib.Future(
+                symbol, exchange=exchange, currency=currency
+            )
+        return contract
 
     def makeOrder(
         self,
@@ -165,36 +338,31 @@ class InteractiveBrokers(BrokerBase):
             **kwargs,
         )
 
-    def placeStockOrder(
+    def _buildContract(
+        self, instrument: str, exchange: str
+    ) -> Union[ib.Stock, ib.Future]:
+        symbol, currency, trade_type = _parse_instrument(instrument)
+        factory = _TRADE_TYPE_FACTORY.get(trade_type)
+        if factory is None:
+            raise ValueError(f"Unknown trade type: {trade_type}")
+        return getattr(self, factory)(
+            symbol=symbol, exchange=exchange, currency=currency
+        )
+
+    def _buildOrder(
         self,
-        instrument: str,
         qty: float,
-        orderType: str = "MKT",
-        exchange: str = "SMART",
-        price: float = UNSET_DOUBLE,
-        stop_price: float = UNSET_DOUBLE,
+        orderType: str,
+        price: float,
+        stop_price: float,
         **kwargs,
-    ) -> str:
-
-        symbol, currency, trade_type = instrument.upper().split("-")
-        contract: Union[ib.Stock, ib.Future] = None
-        if trade_type.lower() == "spot":
-            contract = self.makeStockContract(
-                symbol=symbol, exchange=exchange, currency=currency
-            )
-        elif trade_type.lower() == "perp":
-            contract = self.makeFutureContract(
-                symbol=symbol, exchange=exchange, currency=currency
-            )
-        else:
-            raise ValueError(f"Unknown trade type: {trade_type}")
-
+    ) -> ib.Order:
         if qty > 0:
             action = "BUY"
         else:
             action = "SELL"
             qty = abs(qty)
-        order = self.makeOrder(
+        return self.makeOrder(
             action=action,
             qty=qty,
             orderType=orderType,
@@ -202,10 +370,36 @@ class InteractiveBrokers(BrokerBase):
             stop_price=stop_price,
             **kwargs,
         )
-        trade = self._ib.placeOrder(contract, order)
-        self._ib.waitOnUpdate()
+
+    def _submitOrder(
+        self,
+        instrument: str,
+        qty: float,
+        orderType: str = "MKT",
+        exchange: str = "SMART",
+        price: float = UNSET_DOUBLE,
+        stop_price: float = UNSET_DOUBLE,
+        **kwargs,
+    ) -> ib.Trade:
+        contract = self._buildContract(instrument, exchange)
+        order = self._buildOrder(qty, orderType, price, stop_price, **kwargs)
+        return self._ib.placeOrder(contract, order)
+
+    def _appendOrderRecord(self, order: ib.Order) -> None:
+        row = len(self._oid_index)
+        if row == len(self._oid_qty):
+            self._oid_qty = np.concatenate(
+                [self._oid_qty, np.empty(row, dtype=np.float32)]
+            )
+        self._oid_index[order.orderId] = row
+        self._oid_qty[row] = (
+            order.totalQuantity if order.action == "BUY" else -order.totalQuantity
+        )
+
+    def _recordTrade(self, trade: ib.Trade) -> str:
         order_id = str(trade.order.orderId)
-        self.orderbyid[order_id] = order
+        self.orderbyid[order_id] = trade.order
+        self._appendOrderRecord(trade.order)
         order_status = trade.orderStatus
         log = trade.log[-1]
         msg = f"Order {order_id} {order_status.status}"
@@ -217,6 +411,42 @@ class InteractiveBrokers(BrokerBase):
             self.logger.error(log.message)
         return order_id
 
+    def placeStockOrder(
+        self,
+        instrument: str,
+        qty: float,
+        orderType: str = "MKT",
+        exchange: str = "SMART",
+        price: float = UNSET_DOUBLE,
+        stop_price: float = UNSET_DOUBLE,
+        **kwargs,
+    ) -> str:
+        trade = self._submitOrder(
+            instrument, qty, orderType, exchange, price, stop_price, **kwargs
+        )
+        self._ib.waitOnUpdate()
+        self._invalidateTradeIndex()
+        return self._recordTrade(trade)
+
+    def placeStockOrders(self, specs: List[dict]) -> List[str]:
+        """
+        Place several orders and wait for a single IB update after submitting all
+        of them, instead of one round trip per order.
+
+        Parameters:
+            specs (List[dict]): Keyword arguments of placeStockOrder for each order,
+                e.g. {"instrument": "GOOGL-USD-SPOT", "qty": 1, "orderType": "MKT"}.
+
+        Returns:
+            List[str]: The IDs of the placed orders, in the order of specs.
+        """
+        trades = [self._submitOrder(**spec) for spec in specs]
+        if len(trades) == 0:
+            return []
+        self._ib.waitOnUpdate()
+        self._invalidateTradeIndex()
+        return [self._recordTrade(trade) for trade in trades]
+
     def closePosition(self, tickers: str | List[str] = []) -> None:
         if isinstance(tickers, str):
             tickers = [tickers]
@@ -232,12 +462,24 @@ class InteractiveBrokers(BrokerBase):
                 orderType="MKT",
             )
 
+    def _getTradeIndex(self) -> Dict[int, ib.Trade]:
+        """
+        Return a mapping of orderId to Trade. The mapping is rebuilt from
+        self._ib.trades() only when it is older than _TRADE_INDEX_TTL, so repeated
+        status checks within the same tick share one scan.
+        """
+        now = time.monotonic()
+        if now - self._trade_index_stamp > self._TRADE_INDEX_TTL:
+            self._trade_index = {t.order.orderId: t for t in self._ib.trades()}
+            self._trade_index_stamp = now
+        return self._trade_index
+
+    def _invalidateTradeIndex(self) -> None:
+        self._trade_index_stamp = float("-inf")
+
     def getTradesById(self, order_ids: List[str] = []) -> Dict[str, ib.Trade | None]:
-        all_trades = self._ib.trades()
-        res = dict()
-        for id in order_ids:
-            res[id] = next((x for x in all_trades if x.order.orderId == id), None)
-        return res
+        trade_index = self._getTradeIndex()
+        return {id: trade_index.get(int(id)) for id in order_ids}
 
     def getOrdersById(self, order_ids: List[str] = []) -> Dict[str, ib.Order | None]:
         trades = self.getTradesById(order_ids)
@@ -247,57 +489,47 @@ class InteractiveBrokers(BrokerBase):
         }
 
     def cancelOrders(self, order_ids: List[str] = []) -> None:
-        open_orders = [x.order for x in self._ib.openTrades()]
-        if len(order_ids) == 0:
-            order_ids = list(set([str(x.orderId) for x in open_orders]))
-        else:
-            order_ids = list(set([id for id in order_ids]))
-        for order in open_orders:
-            if order.orderId in order_ids:
-                self._ib.cancelOrder(order)
-                self.logger.warning(f"Order {order.orderId} has been canceled.")
-                self.sleep(0.001)
+        wanted = {int(id) for id in order_ids} if order_ids else None
+        cancelled = False
+        for trade in self._ib.openTrades():
+            order = trade.order
+            if wanted is not None and order.orderId not in wanted:
+                continue
+            self._ib.cancelOrder(order)
+            self.logger.warning(f"Order {order.orderId} has been canceled.")
+            cancelled = True
+        if cancelled:
+            self.sleep(0.001)
 
-    def isPending(self, order_id: str) -> bool:
-        trade = self.getTradesById([order_id])[order_id]
-        if trade is None:
+    def getOrderQty(self, order_id: str) -> float:
+        """
+        Get the signed quantity of an order placed by this broker, positive for
+        buys and negative for sells. Returns 0.0 if the order is unknown.
+        """
+        row = self._oid_index.get(int(order_id))
+        if row is None:
             self.logger.error(f"Order {order_id} not found.")
-            return False
-        res = trade.orderStatus.status in {
-            ib.OrderStatus.ApiPending,
-            ib.OrderStatus.PendingSubmit,
-            ib.OrderStatus.Inactive,
-        }
-        return res
+            return 0.0
+        return float(self._oid_qty[row])
 
-    def isSumbitted(self, order_id: str) -> bool:
+    def getOrderStatus(self, order_id: str) -> str | None:
         trade = self.getTradesById([order_id])[order_id]
         if trade is None:
             self.logger.error(f"Order {order_id} not found.")
-            return False
-        return trade.orderStatus.status in {
-            ib.OrderStatus.Submitted,
-            ib.OrderStatus.PreSubmitted,
-        }
+            return None
+        return str(trade.orderStatus.status)
+
+    def isPending(self, order_id: str) -> bool:
+        return self.getOrderStatus(order_id) in self._PENDING_STATUSES
+
+    def isSumbitted(self, order_id: str) -> bool:
+        return self.getOrderStatus(order_id) in self._SUBMITTED_STATUSES
 
     def isFilled(self, order_id: str) -> bool:
-        trade = self.getTradesById([order_id])[order_id]
-        if trade is None:
-            self.logger.error(f"Order {order_id} not found.")
-            return False
-        return trade.orderStatus.status == ib.OrderStatus.Filled
+        return self.getOrderStatus(order_id) == ib.OrderStatus.Filled
 
     def isCancelled(self, order_id: str) -> bool:
-        trade = self.getTradesById([order_id])[order_id]
-        if trade is None:
-            self.logger.error(f"Order {order_id} not found.")
-            return False
-        res = trade.orderStatus.status in {
-            ib.OrderStatus.PendingCancel,
-            ib.OrderStatus.Cancelled,
-            ib.OrderStatus.ApiCancelled,
-        }
-        return res
+        return self.getOrderStatus(order_id) in self._CANCELLED_STATUSES
 
     def getFilledPrice(self, order_id: str) -> float:
         trade = self.getTradesById([order_id])[order_id]
@@ -310,89 +542,79 @@ class InteractiveBrokers(BrokerBase):
         all_positions = self.getPositionsDF()
         if all_positions.empty:
             return {t: Position(t) for t in tickers}
-        else:
-            all_positions.set_index("symbol", inplace=True)
-            if tickers == []:
-                tickers = all_positions.index
-            res = {
-                t: Position(
-                    symbol=t,
-                    currency=all_positions.loc[t, "currency"],
-                    position=all_positions.loc[t, "position"],
-                    avg_cost=all_positions.loc[t, "avg_cost"],
-                    unrealized_pnl=all_positions.loc[t, "unrealized_pnl"],
-                )
-                if t in all_positions.index
-                else Position(t)
-                for t in tickers
-            }
-            return res
+        all_positions = all_positions.set_index("symbol")
+        # A symbol can repeat, e.g. a stock and an option on it or several accounts;
+        # keep its first row so the reindex below has unique labels
+        all_positions = all_positions[~all_positions.index.duplicated(keep="first")]
+        if len(tickers) == 0:
+            tickers = all_positions.index.to_list()
+        positions = all_positions.reindex(tickers)
+        currency = positions["currency"].to_numpy()
+        position = positions["position"].to_numpy()
+        avg_cost = positions["avg_cost"].to_numpy()
+        unrealized_pnl = positions["unrealized_pnl"].to_numpy()
+        held = positions["position"].notna().to_numpy()
+        return {
+            t: Position(
+                symbol=t,
+                currency=currency[i],
+                position=position[i],
+                avg_cost=avg_cost[i],
+                unrealized_pnl=unrealized_pnl[i],
+            )
+            if held[i]
+            else Position(t)
+            for i, t in enumerate(tickers)
+        }
 
     def getExecuteOrdersDF(self) -> pd.DataFrame:
         executed = self._ib.executions()
         return pd.DataFrame(
-            list(
-                map(
-                    lambda ex: pd.Series(
-                        {
-                            "trade_id": ex.permId,
-                            "order_id": ex.orderId,
-                            "exchange": ex.exchange,
-                            "amount": ex.shares,
-                            "price": ex.price,
-                            "timestamp": ex.time,
-                        }
-                    ),
-                    executed,
-                )
-            )
+            {
+                "trade_id": [ex.permId for ex in executed],
+                "order_id": [ex.orderId for ex in executed],
+                "exchange": [ex.exchange for ex in executed],
+                "amount": [ex.shares for ex in executed],
+                "price": [ex.price for ex in executed],
+                "timestamp": [ex.time for ex in executed],
+            }
         )
 
     def getOpenOrdersDF(self) -> pd.DataFrame:
         opens = self._ib.openTrades()
         return pd.DataFrame(
-            list(
-                map(
-                    lambda op: pd.Series(
-                        {
-                            "id": op.order.orderId,
-                            "symbol": op.contract.symbol,
-                            "currency": op.contract.currency,
-                            "action": op.order.action,
-                            "amount": op.order.totalQuantity,
-                            "type": op.order.orderType,
-                            "lmtPrice": op.order.lmtPrice,
-                            "secType": op.contract.secType,
-                            "status": op.orderStatus.status,
-                        }
-                    ),
-                    opens,
-                )
-            )
+            {
+                "id": [op.order.orderId for op in opens],
+                "symbol": [op.contract.symbol for op in opens],
+                "currency": [op.contract.currency for op in opens],
+                "action": [op.order.action for op in opens],
+                "amount": [op.order.totalQuantity for op in opens],
+                "type": [op.order.orderType for op in opens],
+                "lmtPrice": [op.order.lmtPrice for op in opens],
+                "secType": [op.contract.secType for op in opens],
+                "status": [op.orderStatus.status for op in opens],
+            }
         )
 
     def getPositionsDF(self) -> pd.DataFrame:
-        portfolio = self._ib.portfolio()
+        return self._portfolioToDF(self._ib.portfolio())
+
+    def _portfolioToDF(self, portfolio: List[ib.PortfolioItem]) -> pd.DataFrame:
         return pd.DataFrame(
-            list(
-                map(
-                    lambda port: pd.Series(
-                        {
-                            "symbol": port.contract.symbol,
-                            "currency": port.contract.currency,
-                            "position": port.position,
-                            "market_price": port.marketPrice,
-                            "avg_cost": port.averageCost,
-                            "market_value": port.marketValue,
-                            "unrealized_pnl": port.unrealizedPNL,
-                            "realized_pnl": port.realizedPNL,
-                            "primary_exchange": port.contract.primaryExchange,
-                        }
-                    ),
-                    portfolio,
-                )
-            )
-        )
+            {
+                "symbol": [port.contract.symbol for port in portfolio],
+                "currency": [port.contract.currency for port in portfolio],
+                "position": [port.position for port in portfolio],
+                "market_price": [port.marketPrice for port in portfolio],
+                "avg_cost": [port.averageCost for port in portfolio],
+                "market_value": [port.marketValue for port in portfolio],
+                "unrealized_pnl": [port.unrealizedPNL for port in portfolio],
+                "realized_pnl": [port.realizedPNL for port in portfolio],
+                "primary_exchange": [
+                    port.contract.primaryExchange for port in portfolio
+                ],
+            }
+        ).astype(self._POSITION_DTYPES)
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+from .InteractiveBrokers import CommissionSchemeFixed, InteractiveBrokers
@@ -4,9 +4,9 @@ import logging
 import time
 from typing import Dict, List
 
-import pytz
+from ..model.models import Position
 
-from model.models import Position
+_UTC = datetime.timezone.utc
 
 
 class BrokerBase(abc.ABC):
@@ -47,7 +47,7 @@ class BrokerBase(abc.ABC):
         :return: A datetime object representing the current UTC datetime.
         :rtype: datetime.datetime
         """
-        return datetime.datetime.now(pytz.UTC)
+        return datetime.datetime.now(_UTC)
 
     @abc.abstractmethod
     def update(self) -> None:
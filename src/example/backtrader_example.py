@@ -1,13 +1,32 @@
-import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List
 
 import backtrader as bt
-import yfinance as yf
+import pandas as pd
 
-sys.path.append("src")
+from src.broker import CommissionSchemeFixed
+from src.strategy.momentum_williamsR import (
+    MomentumWilliamsStrategy,
+    precompute_indicators,
+)
+from src.utils.yfinance_helper import yf_cached_download
 
-from broker.InteractiveBrokers import CommissionSchemeFixed
+# Column layout expected by bt.feeds.PandasDirectData, after the datetime index
+BT_COLUMNS = ["open", "high", "low", "close", "volume", "openinterest"]
 
-from strategy.momentum_williamsR import MomentumWilliamsStrategy
+
+def to_bt_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a yfinance DataFrame to the positional column layout read by
+    bt.feeds.PandasDirectData. Frames already in that layout are returned as is.
+    """
+    if list(data.columns) == BT_COLUMNS:
+        return data
+    frame = data[["Open", "High", "Low", "Close", "Volume"]].astype(float)
+    frame.columns = BT_COLUMNS[:-1]
+    frame["openinterest"] = 0.0
+    return frame
 
 
 def run_backtest(
@@ -21,7 +40,7 @@ def run_backtest(
     # cerebro.broker = bt.brokers.BackBroker(slip_perc=0.005)
     cerebro.addstrategy(strategy, **st_kwargs)
     for data in stock_data_list:
-        cerebro.adddata(bt.feeds.PandasData(dataname=data))
+        cerebro.adddata(bt.feeds.PandasDirectData(dataname=to_bt_frame(data)))
     cerebro.broker.addcommissioninfo(CommissionSchemeFixed())
     cerebro.broker.setcash(ini_cash)
     cerebro.addanalyzer(
@@ -43,11 +62,60 @@ def run_backtest(
         return res.trade_record
 
 
+# Data shared by the sweep workers, sent once per process instead of per task
+_sweep_data: list = []
+_sweep_indicators: dict | None = None
+
+
+def _init_sweep_worker(stock_data_list: list, indicators: dict | None = None) -> None:
+    global _sweep_data, _sweep_indicators
+    _sweep_data = stock_data_list
+    _sweep_indicators = indicators
+
+
+def _run_sweep_task(strategy, ini_cash, st_kwargs: dict) -> float:
+    if _sweep_indicators is not None:
+        st_kwargs = {**st_kwargs, "indicator_cache": _sweep_indicators}
+    return float(
+        run_backtest(
+            _sweep_data, strategy, ini_cash=ini_cash, return_value=True, **st_kwargs
+        )
+    )
+
+
+def sweep(
+    param_grid: List[dict],
+    stock_data_list: list,
+    strategy,
+    ini_cash=10000,
+    max_workers: int | None = None,
+    precompute: bool = True,
+) -> List[float]:
+    """
+    Run run_backtest for every parameter set in param_grid in parallel, one worker
+    process per CPU core by default, and return the end values in the same order.
+    With precompute, the indicators of MomentumWilliamsStrategy are computed once
+    for the whole grid and shared with the workers.
+    """
+    bt_data_list = [to_bt_frame(data) for data in stock_data_list]
+    indicators = None
+    if precompute and issubclass(strategy, MomentumWilliamsStrategy):
+        indicators = precompute_indicators(bt_data_list[0], param_grid)
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_sweep_worker,
+        initargs=(bt_data_list, indicators),
+    ) as executor:
+        return list(
+            executor.map(partial(_run_sweep_task, strategy, ini_cash), param_grid)
+        )
+
+
 if __name__ == "__main__":
     ticker_quote = ["SOXL"]  # ,"SBUX"
     ticker_hedge = ["SQQQ"]
-    quote_data = yf.download(ticker_quote, period="2y", interval="1h")
-    hedge_data = yf.download(ticker_hedge, period="2y", interval="1h")
+    quote_data = yf_cached_download(ticker_quote, period="2y", interval="1h")
+    hedge_data = yf_cached_download(ticker_hedge, period="2y", interval="1h")
     strategy = MomentumWilliamsStrategy
 
     run_backtest(
@@ -1,13 +1,13 @@
 import logging
-import sys
 from datetime import datetime
+from glob import glob
 from os import makedirs
-from os.path import exists, isfile
+from os.path import isfile
 
+import numpy as np
 import pandas as pd
 
-sys.path.append("src")
-from grabber.YahooFinance import YahooFinanceGrabber
+from src.grabber.YahooFinance import YahooFinanceGrabber
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,64 +17,91 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def drop_tz(datetimes: pd.Series) -> pd.Series:
+    """
+    Drop the timezone of a datetime column while keeping its wall-clock time.
+    String columns, as read back from CSV, may mix UTC offsets across daylight
+    saving changes, so the offset text is cut off before parsing.
+    """
+    if datetimes.dtype == object:
+        return pd.to_datetime(datetimes.str[:19])
+    if datetimes.dt.tz is not None:
+        return datetimes.dt.tz_localize(None)
+    return datetimes
+
+
+def migrate_csv_cache(datadir: str = "F:/Data/Stock") -> None:
+    """
+    Convert the CSV files of the older cache layout to Parquet. Files that already
+    have a Parquet counterpart are skipped, and the CSV files are left in place.
+    """
+    for csv_path in glob(f"{datadir}/*/*.csv"):
+        parquet_path = csv_path[: -len(".csv")] + ".parquet"
+        if isfile(parquet_path):
+            continue
+        data = pd.read_csv(csv_path)
+        data["Datetime"] = drop_tz(data["Datetime"])
+        data.to_parquet(parquet_path, index=False, compression="zstd")
+        logger.info(f"Converted {csv_path} to {parquet_path}")
+
+
 def update_yf_data(ticker: str, interval: str, datadir: str = "F:/Data/Stock") -> None:
-    if not exists(f"{datadir}/{interval}"):
-        makedirs(f"{datadir}/{interval}")
-    file_path = f"{datadir}/{interval}/{ticker}.csv"
+    makedirs(f"{datadir}/{interval}", exist_ok=True)
+    file_path = f"{datadir}/{interval}/{ticker}.parquet"
     yf = YahooFinanceGrabber(ticker, interval)
 
     if isfile(file_path):
         # Load old stock data if exists
-        old_data = pd.read_csv(file_path)
-        old_data["Datetime"] = pd.to_datetime(old_data["Datetime"])
-        old_data["Datetime"] = [x.tz_localize(None) for x in old_data["Datetime"]]
+        old_data = pd.read_parquet(file_path)
+        old_data["Datetime"] = drop_tz(old_data["Datetime"])
 
         # Calculate the days gap and download new stock price data
         today = datetime.now().date()
-        lastest_date = old_data["Datetime"].sort_values().iloc[-1].date()
-        earliest_date = old_data["Datetime"].sort_values().iloc[0].date()
+        lastest_date = old_data["Datetime"].max().date()
+        earliest_date = old_data["Datetime"].min().date()
         period = min(int(yf.max_period[interval][:-1]), (today - lastest_date).days + 1)
         if int(yf.max_period[interval][:-1]) > (today - earliest_date).days + 1:
             period = yf.max_period[interval][:-1]
         stock_data = yf.getHistoricalData(period=f"{period}d")
         stock_data.reset_index(inplace=True)
-        stock_data["Datetime"] = [x.tz_localize(None) for x in stock_data["Datetime"]]
+        stock_data["Datetime"] = drop_tz(stock_data["Datetime"])
 
         # Check if split shares
-        intersect = old_data[["Datetime", "Close"]].merge(
-            stock_data[["Datetime", "Close"]], on="Datetime"
+        old_close = old_data.set_index("Datetime")["Close"]
+        new_close = stock_data.set_index("Datetime")["Close"]
+        common_idx = old_close.index.intersection(new_close.index)
+        ratio_arr = np.round(
+            new_close.loc[common_idx].to_numpy() / old_close.loc[common_idx].to_numpy(),
+            5,
         )
-        intersect["ratio"] = intersect["Close_y"] / intersect["Close_x"]
-        ratio = intersect["ratio"].round(5).value_counts()
-        if len(ratio) > 1 and abs(ratio.index[0] - ratio.index[1]) > 0.1:
+        ratios, counts = np.unique(ratio_arr[~np.isnan(ratio_arr)], return_counts=True)
+        ratios = ratios[np.argsort(-counts, kind="stable")]  # Most frequent first
+        if len(ratios) > 1 and abs(ratios[0] - ratios[1]) > 0.1:
             logger.error(
                 "Error: Multiple ratios of close prices between splitting shares found."
             )
             return
-        ratio = ratio.index[0]
+        ratio = ratios[0]
         if round(ratio, 1) != 1:  # Shares splitting happens
             logger.info(f"Stock splits detected in {ticker}, split ratio: {ratio}")
             old_data[["Open", "High", "Low", "Close", "Adj Close"]] *= ratio
             old_data["Volume"] /= ratio
 
         # Append the new stock data
-        stock_data = (
-            pd.concat([old_data, stock_data])
-            .sort_values("Datetime")
-            .drop_duplicates("Datetime", keep="last")
+        stock_data = pd.concat([old_data, stock_data]).drop_duplicates(
+            "Datetime", keep="last"
         )
     else:
         stock_data = yf.getHistoricalData()
         stock_data.reset_index(inplace=True)
     stock_data.sort_values("Datetime", inplace=True)
-    stock_data.to_csv(file_path, index=False)
+    stock_data.to_parquet(file_path, index=False, compression="zstd")
 
 
 if __name__ == "__main__":
     workdir = "F:/Data/Stock"
     today = datetime.now().date()
-    if not exists(f"{workdir}/logs"):
-        makedirs(f"{workdir}/logs")
+    makedirs(f"{workdir}/logs", exist_ok=True)
     logging.basicConfig(
         filename=f"{workdir}/logs/{today}.log",
         encoding="utf-8",
@@ -128,6 +155,9 @@ if __name__ == "__main__":
     ]
     intervals = ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"]
 
+    migrate_csv_cache(workdir)
+    # Sequential: yf.download keeps its results in module-global state, so
+    # concurrent updates could write another ticker's bars into the cache
     for interval in intervals:
         for ticker in tickers:
             update_yf_data(ticker, interval)
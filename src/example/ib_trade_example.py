@@ -1,13 +1,10 @@
-import sys
-
-sys.path.append("src")
 import logging
 from datetime import datetime
 
-from broker.InteractiveBrokers import InteractiveBrokers
-from grabber.YahooFinance import YahooFinanceGrabber
-from strategy.MomentWilliamsR import MomentWilliamsR
-from trader.intradayTrader import IntradayTrader
+from src.broker import InteractiveBrokers
+from src.grabber.YahooFinance import YahooFinanceGrabber
+from src.strategy.MomentWilliamsR import MomentWilliamsR
+from src.trader.intradayTrader import IntradayTrader
 
 cur_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 logging.basicConfig(
@@ -1,13 +1,82 @@
+import asyncio
+import functools
 import logging
-import re
-from datetime import datetime, timedelta
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+from zoneinfo import ZoneInfo
 
+import numpy as np
+import orjson
 import pandas as pd
 import schwab
 
 from .base import DataGrabberBase
 
+_MARKET_TZ = ZoneInfo("America/New_York")
+
+
+def _parse_period(text: str) -> tuple[int, str]:
+    """
+    Split a period or interval string such as "270d" into its leading number and
+    the unit text that follows it.
+    """
+    num = 0
+    i = 0
+    for i, c in enumerate(text):
+        code = ord(c) - 48
+        if not 0 <= code <= 9:
+            break
+        num = num * 10 + code
+    else:
+        i = len(text)
+    return num, text[i:]
+
+
+@functools.lru_cache(maxsize=8)
+def _get_client(
+    api_key: str, api_secret: str, token_path: str | None, callback_url: str
+) -> schwab.client.Client:
+    """
+    Create an authenticated client, shared by every grabber using the same
+    credentials so the token file and login flow are only gone through once.
+    """
+    if token_path is not None:
+        return schwab.auth.client_from_token_file(
+            token_path=token_path,
+            api_key=api_key,
+            app_secret=api_secret,
+        )
+    # return schwab.auth.client_from_login_flow(
+    #     webdriver=webdriver.Edge(),
+    #     api_key=api_key,
+    #     app_secret=api_secret,
+    #     callback_url=callback_url,
+    #     token_path="./token1",
+    # )
+    return schwab.auth.client_from_manual_flow(
+        api_key=api_key,
+        app_secret=api_secret,
+        callback_url=callback_url,
+        token_path="./token1",
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """
+    The event loop every AsyncClient request runs on. A client's pooled
+    connections are bound to the loop they were opened on, so the loop must
+    outlive single calls, unlike the one asyncio.run creates and closes.
+    """
+    return asyncio.new_event_loop()
+
+
+@functools.lru_cache(maxsize=8)
+def _get_account_hash(client: schwab.client.Client) -> str:
+    # The account hash is stable for the lifetime of a client session
+    res = client.get_account_numbers()
+    return str(orjson.loads(res.content)[0]["hashValue"])
+
 
 class SchwabGrabber(DataGrabberBase):
     _max_period = {
@@ -21,6 +90,80 @@ class SchwabGrabber(DataGrabberBase):
         "1M": "20y",
     }
 
+    # Period and frequency enums accepted by get_price_history, keyed by unit
+    _PriceHistory = schwab.client.Client.PriceHistory
+    _valid_periods = {
+        abbr: (period_type, {x.value: x for x in periods})
+        for abbr, period_type, periods in [
+            (
+                "d",
+                _PriceHistory.PeriodType.DAY,
+                [
+                    _PriceHistory.Period.ONE_DAY,
+                    _PriceHistory.Period.TWO_DAYS,
+                    _PriceHistory.Period.THREE_DAYS,
+                    _PriceHistory.Period.FOUR_DAYS,
+                    _PriceHistory.Period.FIVE_DAYS,
+                    _PriceHistory.Period.TEN_DAYS,
+                ],
+            ),
+            (
+                "m",
+                _PriceHistory.PeriodType.MONTH,
+                [
+                    _PriceHistory.Period.ONE_MONTH,
+                    _PriceHistory.Period.TWO_MONTHS,
+                    _PriceHistory.Period.THREE_MONTHS,
+                    _PriceHistory.Period.SIX_MONTHS,
+                ],
+            ),
+            (
+                "y",
+                _PriceHistory.PeriodType.YEAR,
+                [
+                    _PriceHistory.Period.ONE_YEAR,
+                    _PriceHistory.Period.TWO_YEARS,
+                    _PriceHistory.Period.THREE_YEARS,
+                    _PriceHistory.Period.FIVE_YEARS,
+                    _PriceHistory.Period.TEN_YEARS,
+                    _PriceHistory.Period.FIFTEEN_YEARS,
+                    _PriceHistory.Period.TWENTY_YEARS,
+                ],
+            ),
+        ]
+    }
+    _valid_intervals = {
+        abbr: (frequency_type, {x.value: x for x in frequencies})
+        for abbr, frequency_type, frequencies in [
+            (
+                "m",
+                _PriceHistory.FrequencyType.MINUTE,
+                [
+                    _PriceHistory.Frequency.EVERY_MINUTE,
+                    _PriceHistory.Frequency.EVERY_FIVE_MINUTES,
+                    _PriceHistory.Frequency.EVERY_TEN_MINUTES,
+                    _PriceHistory.Frequency.EVERY_FIFTEEN_MINUTES,
+                    _PriceHistory.Frequency.EVERY_THIRTY_MINUTES,
+                ],
+            ),
+            (
+                "d",
+                _PriceHistory.FrequencyType.DAILY,
+                [_PriceHistory.Frequency.DAILY],
+            ),
+            (
+                "w",
+                _PriceHistory.FrequencyType.WEEKLY,
+                [_PriceHistory.Frequency.WEEKLY],
+            ),
+            (
+                "M",
+                _PriceHistory.FrequencyType.MONTHLY,
+                [_PriceHistory.Frequency.MONTHLY],
+            ),
+        ]
+    }
+
     def __init__(
         self,
         api_key: str,
@@ -59,47 +202,35 @@ class SchwabGrabber(DataGrabberBase):
         super().__init__(tickers, interval=interval, period=period, name=name)
 
         if client is None:
-            if token_path is not None:
-                self.client = schwab.auth.client_from_token_file(
-                    token_path=token_path,
-                    api_key=api_key,
-                    app_secret=api_secret,
-                )
-            else:
-                token_path = "./token1"
-                # self.client = schwab.auth.client_from_login_flow(
-                #     webdriver=webdriver.Edge(),
-                #     api_key=api_key,
-                #     app_secret=api_secret,
-                #     callback_url=callback_url,
-                #     token_path=token_path,
-                # )
-                self.client = schwab.auth.client_from_manual_flow(
-                    api_key=api_key,
-                    app_secret=api_secret,
-                    callback_url=callback_url,
-                    token_path=token_path,
-                )
+            self.client = _get_client(api_key, api_secret, token_path, callback_url)
         else:
             self.client = client
 
-        self.account_hash = self.client.get_account_numbers().json()[0]["hashValue"]
+        if isinstance(self.client, schwab.client.AsyncClient):
+            # Cannot be awaited here, and getting price history does not need it
+            self.account_hash = None
+        else:
+            self.account_hash = _get_account_hash(self.client)
         self.logger = logging.getLogger(__name__)
 
-    def getHistoricalData(
+    def _priceHistoryArgs(
         self,
-        tickers: str | List[str] = None,
         interval: str = None,
         period: str = None,
         start: datetime = None,
         end: datetime = None,
-    ) -> pd.DataFrame:
-        tickers = self.tickers if (tickers is None) else tickers
+    ) -> tuple[dict, str]:
+        """
+        Resolve the get_price_history arguments, except the symbol, shared by all
+        tickers of one getHistoricalData call.
 
+        Returns:
+            tuple[dict, str]: The keyword arguments and a description for logging.
+        """
         if start is None:
             start = datetime(year=1971, month=1, day=1)
         if end is None:
-            end = datetime.utcnow() + timedelta(days=7)
+            end = datetime.now(timezone.utc) + timedelta(days=7)
 
         PriceHistory = schwab.client.Client.PriceHistory
         time_text = ""
@@ -112,45 +243,9 @@ class SchwabGrabber(DataGrabberBase):
         )
         if period != "max" and period is not None:
             period_type_abbr = period[-1].lower()
-            period_num = int(re.search(r"\d+", period).group())
-            if period_type_abbr == "d":
-                period_type = PriceHistory.PeriodType.DAY
-                valid_periods = {
-                    x.value: x
-                    for x in [
-                        PriceHistory.Period.ONE_DAY,
-                        PriceHistory.Period.TWO_DAYS,
-                        PriceHistory.Period.THREE_DAYS,
-                        PriceHistory.Period.FOUR_DAYS,
-                        PriceHistory.Period.FIVE_DAYS,
-                        PriceHistory.Period.TEN_DAYS,
-                    ]
-                }
-            elif period_type_abbr == "m":
-                period_type = PriceHistory.PeriodType.MONTH
-                valid_periods = {
-                    x.value: x
-                    for x in [
-                        PriceHistory.Period.ONE_MONTH,
-                        PriceHistory.Period.TWO_MONTHS,
-                        PriceHistory.Period.THREE_MONTHS,
-                        PriceHistory.Period.SIX_MONTHS,
-                    ]
-                }
-            elif period_type_abbr == "y":
-                period_type = PriceHistory.PeriodType.YEAR
-                valid_periods = {
-                    x.value: x
-                    for x in [
-                        PriceHistory.Period.ONE_YEAR,
-                        PriceHistory.Period.TWO_YEARS,
-                        PriceHistory.Period.THREE_YEARS,
-                        PriceHistory.Period.FIVE_YEARS,
-                        PriceHistory.Period.TEN_YEARS,
-                        PriceHistory.Period.FIFTEEN_YEARS,
-                        PriceHistory.Period.TWENTY_YEARS,
-                    ]
-                }
+            period_num = _parse_period(period)[0]
+            if period_type_abbr in self._valid_periods:
+                period_type, valid_periods = self._valid_periods[period_type_abbr]
             else:
                 period_type = PriceHistory.PeriodType.DAY
                 period_num = PriceHistory.Period.ONE_DAY
@@ -178,93 +273,154 @@ class SchwabGrabber(DataGrabberBase):
         # Setting interval
         interval = self.interval if interval is None else interval
         interval_type = interval[-1].lower()
-        interval_num = int(re.search(r"\d+", interval).group())
-        if interval_type == "m":
-            interval_type = PriceHistory.FrequencyType.MINUTE
-            valid_intervals = {
-                x.value: x
-                for x in [
-                    PriceHistory.Frequency.EVERY_MINUTE,
-                    PriceHistory.Frequency.EVERY_FIVE_MINUTES,
-                    PriceHistory.Frequency.EVERY_TEN_MINUTES,
-                    PriceHistory.Frequency.EVERY_FIFTEEN_MINUTES,
-                    PriceHistory.Frequency.EVERY_THIRTY_MINUTES,
-                ]
-            }
-        elif interval_type == "d":
-            interval_type = PriceHistory.FrequencyType.DAILY
-            valid_intervals = {
-                PriceHistory.Frequency.DAILY.value: PriceHistory.Frequency.DAILY
-            }
-        elif interval_type == "w":
-            interval_type = PriceHistory.FrequencyType.WEEKLY
-            valid_intervals = {
-                PriceHistory.Frequency.WEEKLY.value: PriceHistory.Frequency.WEEKLY
-            }
-        elif interval_type == "M":
-            interval_type = PriceHistory.FrequencyType.MONTHLY
-            valid_intervals = {
-                PriceHistory.Frequency.MONTHLY.value: PriceHistory.Frequency.MONTHLY
-            }
-        else:
-            interval_type = PriceHistory.FrequencyType.DAILY
-            valid_intervals = {
-                PriceHistory.Frequency.DAILY.value: PriceHistory.Frequency.DAILY
-            }
+        interval_num = _parse_period(interval)[0]
+        frequency_type, valid_intervals = self._valid_intervals.get(
+            interval_type, self._valid_intervals["d"]
+        )
         if interval_num not in valid_intervals:
             err_msg = (
-                f"Invalid interval: {interval_num}{interval_type}. Valid values are "
+                f"Invalid interval: {interval_num}{frequency_type}. Valid values are "
             )
             for valid_interval in valid_intervals.keys():
-                err_msg += f"{valid_interval}{interval_type}, "
+                err_msg += f"{valid_interval}{frequency_type}, "
             err_msg = err_msg[:-2] + "."
             raise ValueError(err_msg)
         else:
             interval_val = valid_intervals[interval_num]
 
+        kwargs = dict(
+            period_type=period_type,
+            period=period_val,
+            frequency_type=frequency_type,
+            frequency=interval_val,
+            start_datetime=start,
+            end_datetime=end,
+            need_extended_hours_data=True,
+        )
+        return kwargs, f"{interval_val.value} {frequency_type.value} {time_text}"
+
+    def _candlesToDF(self, res) -> pd.DataFrame:
+        candles = orjson.loads(res.content)["candles"]
+        n = len(candles)
+
+        def column(key: str, dtype) -> np.ndarray:
+            return np.fromiter((c[key] for c in candles), dtype=dtype, count=n)
+
+        close = column("close", np.float64)
+        candle_df = pd.DataFrame(
+            {
+                "Open": column("open", np.float64),
+                "High": column("high", np.float64),
+                "Low": column("low", np.float64),
+                "Close": close,
+                "Adj Close": close,
+                "Volume": column("volume", np.int64),
+            },
+            index=pd.DatetimeIndex(
+                pd.to_datetime(column("datetime", np.int64), unit="ms", utc=True),
+                name="Datetime",
+            ).tz_convert(_MARKET_TZ),
+            copy=False,
+        )
+        # Candles arrive in chronological order; only sort if they did not
+        if not candle_df.index.is_monotonic_increasing:
+            candle_df = candle_df.sort_index()
+        return candle_df
+
+    def _joinFrames(self, frames: dict) -> pd.DataFrame:
+        if len(frames) == 1:
+            return next(iter(frames.values()))
+        # One inner join over all tickers, laid out as (column, ticker)
+        res_df = pd.concat(frames, axis=1, join="inner")
+        return res_df.swaplevel(axis=1).sort_index(axis=1)
+
+    def getHistoricalData(
+        self,
+        tickers: str | List[str] = None,
+        interval: str = None,
+        period: str = None,
+        start: datetime = None,
+        end: datetime = None,
+    ) -> pd.DataFrame:
+        if isinstance(self.client, schwab.client.AsyncClient):
+            return _event_loop().run_until_complete(
+                self.getHistoricalDataAsync(tickers, interval, period, start, end)
+            )
+
+        tickers = self.tickers if (tickers is None) else tickers
+        kwargs, text = self._priceHistoryArgs(interval, period, start, end)
         ticker_list = self.tickers if isinstance(tickers, list) else [tickers]
-        res_df = pd.DataFrame()
+        frames = dict()
         for ticker in ticker_list:
-            self.logger.info(
-                f"Getting {ticker} {interval_val.value} {interval_type.value} {time_text} data..."
-            )
+            self.logger.info(f"Getting {ticker} {text} data...")
+            res = self.client.get_price_history(symbol=ticker, **kwargs)
+            frames[ticker] = self._candlesToDF(res)
+        return self._joinFrames(frames)
 
-            res = self.client.get_price_history(
-                symbol=ticker,
-                period_type=period_type,
-                period=period_val,
-                frequency_type=interval_type,
-                frequency=interval_val,
-                start_datetime=start,
-                end_datetime=end,
-                need_extended_hours_data=True,
-            )
-            candle_df = pd.DataFrame.from_dict(res.json()["candles"])
-            candle_df["datetime"] = [
-                datetime.fromtimestamp(x / 1000) for x in candle_df["datetime"]
-            ]
-            candle_df.columns = [x.capitalize() for x in candle_df.columns]
-            candle_df["Adj Colse"] = candle_df["Close"]
-            candle_df = candle_df.sort_index()
-            if res_df.empty:
-                res_df = candle_df
-            else:
-                if not isinstance(res_df.columns, pd.MultiIndex):
-                    res_df.columns = pd.MultiIndex.from_arrays(
-                        [
-                            res_df.columns,
-                            [ticker_list[0]] * len(res_df.columns),
-                        ]
-                    )
-                candle_df.columns = pd.MultiIndex.from_arrays(
-                    [
-                        candle_df.columns,
-                        [ticker] * len(candle_df.columns),
-                    ]
-                )
-                candle_df = candle_df.sort_index(axis=1)
-                res_df = res_df.sort_index(axis=1).merge(candle_df, on="Datetime")
-        return res_df.set_index("Datetime")
+    async def getHistoricalDataAsync(
+        self,
+        tickers: str | List[str] = None,
+        interval: str = None,
+        period: str = None,
+        start: datetime = None,
+        end: datetime = None,
+        max_concurrency: int = 4,
+    ) -> pd.DataFrame:
+        """
+        Same as getHistoricalData, but the tickers are requested concurrently through
+        a schwab.client.AsyncClient, at most max_concurrency at a time.
+        """
+        tickers = self.tickers if (tickers is None) else tickers
+        kwargs, text = self._priceHistoryArgs(interval, period, start, end)
+        ticker_list = self.tickers if isinstance(tickers, list) else [tickers]
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(ticker: str):
+            async with semaphore:
+                self.logger.info(f"Getting {ticker} {text} data...")
+                return await self.client.get_price_history(symbol=ticker, **kwargs)
+
+        responses = await asyncio.gather(*[fetch(t) for t in ticker_list])
+        return self._joinFrames(
+            {t: self._candlesToDF(res) for t, res in zip(ticker_list, responses)}
+        )
+
+    def getLatestData(self) -> Dict[str, Dict[str, float]]:
+        """
+        Retrieves the latest quote of every ticker with a single get_quotes request,
+        instead of one price history request per ticker.
+
+        Unlike the base implementation, which returns the latest bar, the values are
+        day-level: 'Open', 'High', 'Low' and 'Volume' are those of the current
+        session, 'Close' and 'Adj Close' are the last traded price and 'Datetime'
+        is the time of the last trade.
+
+        Returns:
+            Dict[str, Dict[str, float]]: A dictionary where the keys are ticker symbols
+                and the values are dictionaries containing the following data for each ticker:
+                'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'Datetime'.
+        """
+        ticker_list = [self.tickers] if isinstance(self.tickers, str) else self.tickers
+        res = self.client.get_quotes(ticker_list)
+        if isinstance(self.client, schwab.client.AsyncClient):
+            res = _event_loop().run_until_complete(res)
+        quotes = orjson.loads(res.content)
+
+        latest = dict()
+        for ticker in ticker_list:
+            quote = quotes[ticker]["quote"]
+            latest[ticker] = {
+                "Open": quote["openPrice"],
+                "High": quote["highPrice"],
+                "Low": quote["lowPrice"],
+                "Close": quote["lastPrice"],
+                "Adj Close": quote["lastPrice"],
+                "Volume": quote["totalVolume"],
+                "Datetime": datetime.fromtimestamp(
+                    quote["tradeTime"] // 1000, _MARKET_TZ
+                ),
+            }
+        return latest
 
 
 if __name__ == "__main__":
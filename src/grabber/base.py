@@ -1,10 +1,30 @@
 import abc
 import datetime
+import functools
 import logging
 from typing import Dict, List
 
 import pandas as pd
-import pytz
+
+_UTC = datetime.timezone.utc
+
+# Seconds per interval unit; months and years are taken as 30 and 365 days
+_UNIT_SECS = {
+    "s": 1,
+    "m": 60,
+    "h": 60 * 60,
+    "d": 60 * 60 * 24,
+    "w": 60 * 60 * 24 * 7,
+    "M": 60 * 60 * 24 * 30,
+    "y": 60 * 60 * 24 * 365,
+}
+
+# Fields returned per ticker by getLatestData
+_OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+def _as_list(tickers: str | List[str]) -> List[str]:
+    return [tickers] if isinstance(tickers, str) else list(tickers)
 
 
 def get_logger():
@@ -56,25 +76,14 @@ class DataGrabberBase(abc.ABC):
         else:
             self.name = name
         self.data: pd.DataFrame = pd.DataFrame()
-        self.datatime: datetime.datetime = datetime.datetime(
-            1990, 1, 1, tzinfo=pytz.UTC
-        )
+        self.datatime: datetime.datetime = datetime.datetime(1990, 1, 1, tzinfo=_UTC)
         self.logger = get_logger()
 
     def set_tickers(self, tickers: str | List[str]) -> None:
         self.tickers = tickers
 
     def add_tickers(self, tickers: str | List[str]) -> None:
-        if isinstance(tickers, str):
-            if isinstance(self.tickers, str):
-                self.tickers = [self.tickers, tickers]
-            else:
-                self.tickers.append(tickers)
-        else:
-            if isinstance(self.tickers, str):
-                self.tickers = tickers + [self.tickers]
-            else:
-                self.tickers.extend(tickers)
+        self.tickers = _as_list(self.tickers) + _as_list(tickers)
 
     def set_interval(self, interval: str) -> None:
         self.interval = interval
@@ -82,9 +91,7 @@ class DataGrabberBase(abc.ABC):
     def set_period(self, period: str) -> None:
         self.period = period
 
-    def updateData(
-        self, time: datetime.datetime = datetime.datetime.now(pytz.UTC)
-    ) -> int:
+    def updateData(self, time: datetime.datetime | None = None) -> int:
         """
         Update the data stored in the object if the specified time has passed the
         defined interval since the last update.
@@ -112,6 +119,8 @@ class DataGrabberBase(abc.ABC):
         Note: 'self.interval2seconds' is assumed to be a helper method for converting
         intervals to seconds.
         """
+        if time is None:
+            time = datetime.datetime.now(_UTC)
         time_timestamp = time.timestamp()
         sec_diff = time_timestamp - self.datatime.timestamp()
         interval_sec = self.interval2seconds(self.interval)
@@ -122,7 +131,7 @@ class DataGrabberBase(abc.ABC):
             self.logger.error(f"Getting data {self.name} error. No data retrieved.")
             return -2
         self.data = new_data
-        self.datatime = self.data.index[-1].astimezone(pytz.UTC)
+        self.datatime = self.data.index[-1].astimezone(_UTC)
         sec_diff = time_timestamp - self.datatime.timestamp()
         interval_sec = self.interval2seconds(self.interval)
         if sec_diff < interval_sec:
@@ -140,7 +149,9 @@ class DataGrabberBase(abc.ABC):
             )
             return -1
 
-    def interval2seconds(self, interval: str) -> int:
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def interval2seconds(interval: str) -> int:
         """
         Converts a time interval represented as a string into the equivalent number of seconds.
 
@@ -169,24 +180,10 @@ class DataGrabberBase(abc.ABC):
         unit is provided in the interval string.
 
         """
-        unit = interval[-1]
-        number = int(interval[:-1])
-        if unit == "s":
-            return number
-        elif unit == "m":
-            return number * 60
-        elif unit == "h":
-            return number * 60 * 60
-        elif unit == "d":
-            return number * 60 * 60 * 24
-        elif unit == "w":
-            return number * 60 * 60 * 24 * 7
-        elif unit == "M":
-            return number * 60 * 60 * 24 * 30
-        elif unit == "y":
-            return number * 60 * 60 * 24 * 365
-        else:
-            raise ValueError(f"Invalid interval: {interval}")
+        try:
+            return int(interval[:-1]) * _UNIT_SECS[interval[-1]]
+        except KeyError:
+            raise ValueError(f"Invalid interval: {interval}") from None
 
     @abc.abstractmethod
     def getHistoricalData(
@@ -219,12 +216,15 @@ class DataGrabberBase(abc.ABC):
 
     def getLatestData(self) -> Dict[str, Dict[str, float]]:
         """
-        Retrieves the latest data for a list of tickers.
+        Retrieves the latest data for a list of tickers. This implementation returns
+        the fields of the latest bar. Subclasses may read quotes instead, in which
+        case 'Open', 'High', 'Low' and 'Volume' are day-level values; 'Close' is always
+        the latest price, so getLatestCloseData() means the same for every grabber.
 
         Returns:
             Dict[str, Dict[str, float]]: A dictionary where the keys are ticker symbols
                 and the values are dictionaries containing the following data for each ticker:
-                'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume'.
+                'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'Datetime'.
 
         Raises:
             NotImplementedError: This method needs to be implemented in a subclass.
@@ -232,42 +232,17 @@ class DataGrabberBase(abc.ABC):
         hist_df = self.getHistoricalData(period="2d")
         timestamp = hist_df.index[-1]
         hist_row = hist_df.iloc[-1, :]
-        if isinstance(self.tickers, str):
+        if isinstance(hist_row.index, pd.MultiIndex):
+            # (field, ticker) columns of several tickers
+            latest = hist_row.unstack(level=0).loc[self.tickers, _OHLCV_FIELDS]
             return {
-                self.tickers: {
-                    "Open": hist_row["Open"],
-                    "High": hist_row["High"],
-                    "Low": hist_row["Low"],
-                    "Close": hist_row["Close"],
-                    "Adj Close": hist_row["Adj Close"],
-                    "Volume": hist_row["Volume"],
-                    "Datetime": timestamp,
-                }
+                tick: {**row, "Datetime": timestamp}
+                for tick, row in latest.to_dict(orient="index").items()
             }
 
-        res = dict()
-        for tick in self.tickers:
-            if len(self.tickers) > 1:
-                res[tick] = {
-                    "Open": hist_row["Open"][tick],
-                    "High": hist_row["High"][tick],
-                    "Low": hist_row["Low"][tick],
-                    "Close": hist_row["Close"][tick],
-                    "Adj Close": hist_row["Adj Close"][tick],
-                    "Volume": hist_row["Volume"][tick],
-                    "Datetime": timestamp,
-                }
-            else:
-                res[tick] = {
-                    "Open": hist_row["Open"],
-                    "High": hist_row["High"],
-                    "Low": hist_row["Low"],
-                    "Close": hist_row["Close"],
-                    "Adj Close": hist_row["Adj Close"],
-                    "Volume": hist_row["Volume"],
-                    "Datetime": timestamp,
-                }
-        return res
+        tickers = [self.tickers] if isinstance(self.tickers, str) else self.tickers
+        row = hist_row[_OHLCV_FIELDS].to_dict()
+        return {tick: {**row, "Datetime": timestamp} for tick in tickers}
 
     def getLatestCloseData(self) -> float | Dict[str, float]:
         """
@@ -1,18 +1,44 @@
 import math
-import sys
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 
+import numpy as np
 import pandas as pd
 import talib
-from talib import abstract
 
+from ..model.models import Position
+from ._kernels import BUY, ROTATE, SELL, STOP, _decide
 from .base import StrategyBase
 
 cur_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
 
+def _size(cash: float, price: float) -> int:
+    # Whole shares for 95% of cash; cash and price are positive, so int() floors
+    return int(cash / price * 0.95)
+
+
+class TickerState:
+    """
+    A processed data frame together with the columns next() reads, as arrays.
+    """
+
+    __slots__ = ("df", "close", "cmo_cross", "williams_r")
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.close = df["close"].to_numpy()
+        self.cmo_cross = df["cmo_cross"].to_numpy()
+        self.williams_r = df["williams_r"].to_numpy()
+
+
 class MomentWilliamsR(StrategyBase):
+    # Oscillators bounded to [-100, 100], which float32 holds without loss that
+    # matters for the threshold comparisons
+    _oscillator_columns = ["cmo", "cmo_sma", "cmo_diff", "williams_r"]
+    # Price-level series, kept float64 like the prices themselves
+    _price_columns = ["sma", "bband_upper", "bband_mid", "bband_lower"]
+
     def __init__(
         self,
         quote_ticker: str,
@@ -41,83 +67,192 @@ class MomentWilliamsR(StrategyBase):
         self.hedge_ticker = hedge_ticker
         self.stop_loss = stop_loss
         self.capital = capital
+        self._instruments = {t: f"{t}-USD-SPOT" for t in (quote_ticker, hedge_ticker)}
+        # Latest processed state of each data name
+        self._states: Dict[str | int, TickerState] = dict()
+
+    def _warmup(self) -> int:
+        """
+        Number of trailing bars the indicators are computed over. CMO uses Wilder
+        smoothing, whose dependence on the first bars decays by (1 - 1/period) per
+        bar, so it gets enough bars for that weight to fall below 1e-6; the other
+        indicators only need their window. One extra bar feeds the crossover.
+        """
+        cmo_period = self.paras["cmo_period"]
+        cmo_settle = (
+            math.ceil(math.log(1e-6) / math.log(1 - 1 / cmo_period))
+            if cmo_period > 1
+            else 1
+        )
+        # paras are typed int | float, but the periods are whole bar counts
+        return 1 + int(
+            max(
+                cmo_settle + self.paras["cmo_sma_period"],
+                self.paras["williams_period"],
+                self.paras["sma_period"],
+                self.paras["bbands_period"],
+            )
+        )
 
     def indicatorProcess(self, data: pd.DataFrame) -> None:
-        data.columns = data.columns.str.lower()
-        data["cmo"] = abstract.CMO(data, timeperiod=self.paras["cmo_period"])
-        data["cmo_sma"] = talib.SMA(
-            data["cmo"], timeperiod=self.paras["cmo_sma_period"]
+        """
+        Add the indicator columns to data. Only the trailing _warmup() bars are fed
+        to TA-Lib, so the cost does not grow with the history length; earlier rows
+        keep the indicator values they already hold, NaN for new columns.
+        """
+        columns = data.columns.str.lower()
+        if not columns.equals(data.columns):
+            data.columns = columns
+        start = max(len(data) - self._warmup(), 0)
+        close = np.ascontiguousarray(data["close"].iloc[start:], dtype=np.float64)
+        high = np.ascontiguousarray(data["high"].iloc[start:], dtype=np.float64)
+        low = np.ascontiguousarray(data["low"].iloc[start:], dtype=np.float64)
+
+        cmo = talib.CMO(close, timeperiod=self.paras["cmo_period"])
+        cmo_sma = talib.SMA(cmo, timeperiod=self.paras["cmo_sma_period"])
+        williams_r = talib.WILLR(
+            high, low, close, timeperiod=self.paras["williams_period"]
         )
-        data["cmo_cross"] = self.cross_over(data["cmo"], data["cmo_sma"])
-        data.eval("cmo_diff = cmo - cmo_sma", inplace=True)
-        data["williams_r"] = abstract.WILLR(
-            data, timeperiod=self.paras["williams_period"]
+        sma = talib.SMA(close, timeperiod=self.paras["sma_period"])
+        bband_upper, bband_mid, bband_lower = talib.BBANDS(
+            close, timeperiod=self.paras["bbands_period"]
         )
-        data["sma"] = abstract.SMA(data, timeperiod=self.paras["sma_period"])
-        data[["bband_upper", "bband_mid", "bband_lower"]] = abstract.BBANDS(
-            data, timeperiod=self.paras["bbands_period"]
+        oscillators = (cmo, cmo_sma, cmo - cmo_sma, williams_r)
+        for column, values in zip(self._oscillator_columns, oscillators):
+            self._writeTrailing(data, column, values, start, np.float32)
+        prices = (sma, bband_upper, bband_mid, bband_lower)
+        for column, values in zip(self._price_columns, prices):
+            self._writeTrailing(data, column, values, start, np.float64)
+        # A cross needs the CMO difference on both of its bars
+        settled = ~np.isnan(cmo - cmo_sma)
+        settled[1:] &= settled[:-1]
+        self._writeTrailing(
+            data,
+            "cmo_cross",
+            self._crossOverArray(cmo, cmo_sma),
+            start,
+            np.int8,
+            settled,
         )
 
+    @staticmethod
+    def _writeTrailing(
+        data: pd.DataFrame,
+        column: str,
+        values: np.ndarray,
+        start: int,
+        dtype: type,
+        mask: np.ndarray | None = None,
+    ) -> None:
+        """
+        Write values, computed over the rows from start on, into data[column]. Only
+        the rows where mask is set (default: where values is not NaN) are written,
+        so rows the window could not settle and all rows before start keep what the
+        column holds. A missing column is first filled with NaN, or 0 for integers.
+        """
+        if column not in data.columns:
+            fill = 0 if np.issubdtype(dtype, np.integer) else np.nan
+            data[column] = np.full(len(data), fill, dtype=dtype)
+        if mask is None:
+            mask = ~np.isnan(values)
+        rows = start + np.flatnonzero(mask)
+        data.iloc[rows, data.columns.get_loc(column)] = values[mask].astype(dtype)
+
     def init(self):
-        quote_size = self.broker.getHoldings([self.quote_ticker])[self.quote_ticker]
-        hedge_size = self.broker.getHoldings([self.hedge_ticker])[self.hedge_ticker]
+        self._updateCashLeft(
+            self.broker.getPositions([self.quote_ticker, self.hedge_ticker])
+        )
+
+    def _updateCashLeft(
+        self,
+        positions: Dict[str, Position],
+        quote_close: float | None = None,
+        hedge_close: float | None = None,
+    ) -> None:
+        """
+        Update cash_left from the held positions. Close prices that are not given
+        are fetched from the grabbers.
+        """
+        quote_size = positions[self.quote_ticker].position
+        hedge_size = positions[self.hedge_ticker].position
         if quote_size > 0:
-            position_value = (
-                quote_size * self.grabbers[self.quote_ticker].getLatestCloseData()
-            )
+            if quote_close is None:
+                quote_close = self._latestClose(self.quote_ticker)
+            position_value = quote_size * quote_close
         elif hedge_size > 0:
-            position_value = (
-                hedge_size * self.grabbers[self.hedge_ticker].getLatestCloseData()
-            )
+            if hedge_close is None:
+                hedge_close = self._latestClose(self.hedge_ticker)
+            position_value = hedge_size * hedge_close
         else:
             position_value = 0
         self.cash_left = max(self.capital - position_value, 0)
 
+    def _latestClose(self, ticker: str) -> float:
+        """
+        Latest close price of ticker from its grabber.
+        """
+        close = self.grabbers[ticker].getLatestCloseData()
+        # A grabber holding several tickers maps each of them to its close
+        if isinstance(close, dict):
+            close = close[ticker]
+        return close
+
     def move_position(self, src_ticker, dest_ticker, src_size, dest_size) -> List[dict]:
         return [
             {
-                "instrument": f"{src_ticker}-USD-SPOT",
+                "instrument": self._instruments[src_ticker],
                 "qty": -src_size,
                 "orderType": "MKT",
             },
             {
-                "instrument": f"{dest_ticker}-USD-SPOT",
+                "instrument": self._instruments[dest_ticker],
                 "qty": dest_size,
                 "orderType": "MKT",
             },
         ]
 
     def next(self) -> List[dict]:
-        self.init()
-        for data in self.datas:
+        quote_ticker, hedge_ticker = self.quote_ticker, self.hedge_ticker
+
+        for name, data in self.datas.items():
+            # Frames that did not change since the last tick already hold indicators
+            state = self._states.get(name)
+            if state is not None and state.df is data and len(state.close) == len(data):
+                continue
             self.indicatorProcess(data)
-        quote_row = self.datas[self.quote_ticker].iloc[-1]
-        hedge_row = self.datas[self.hedge_ticker].iloc[-1]
+            self._states[name] = TickerState(data)
+        quote_state = self._states[quote_ticker]
+        quote_close = quote_state.close[-1]
+        cmo_cross = quote_state.cmo_cross[-1]
+        williams_r = quote_state.williams_r[-1]
+        hedge_close = self._states[hedge_ticker].close[-1]
+        # One broker lookup for both holdings and costs of the two tickers, and the
+        # closes already in the data instead of fetching them again
+        positions = self.broker.getPositions([quote_ticker, hedge_ticker])
+        self._updateCashLeft(positions, quote_close, hedge_close)
 
         # Calculate signal
-        broker = self.broker
-        holding = broker.getHoldings([self.quote_ticker, self.hedge_ticker])
-        quote_size = holding[self.quote_ticker]
-        hedge_size = holding[self.hedge_ticker]
+        quote_size = positions[quote_ticker].position
+        hedge_size = positions[hedge_ticker].position
         if quote_size > 0:
-            cost = broker.getCosts([self.quote_ticker])[self.quote_ticker]
+            cost = positions[quote_ticker].avg_cost
         elif hedge_size > 0:
-            cost = broker.getCosts([self.hedge_ticker])[self.hedge_ticker]
+            cost = positions[hedge_ticker].avg_cost
         else:
             cost = -1
 
         if quote_size > 0:
-            src_ticker = self.quote_ticker
-            dest_ticker = self.hedge_ticker
+            src_ticker = quote_ticker
+            dest_ticker = hedge_ticker
             size = quote_size
-            src_close_price = quote_row["close"]
-            dest_close_price = hedge_row["close"]
+            src_close_price = quote_close
+            dest_close_price = hedge_close
         elif hedge_size > 0:
-            src_ticker = self.hedge_ticker
-            dest_ticker = self.quote_ticker
+            src_ticker = hedge_ticker
+            dest_ticker = quote_ticker
             size = hedge_size
-            src_close_price = hedge_row["close"]
-            dest_close_price = quote_row["close"]
+            src_close_price = hedge_close
+            dest_close_price = quote_close
         else:
             size = 0
             src_close_price = 1
@@ -126,59 +261,47 @@ class MomentWilliamsR(StrategyBase):
         expected_cash = min(
             max(self.cash_left + size * src_close_price, 1), self.capital
         )
-        new_size = math.floor(expected_cash / dest_close_price * 0.95)
-
-        if cost > 0 and src_close_price / cost < (1 - self.stop_loss):
+        signal, action = _decide(
+            int(cmo_cross),
+            float(williams_r),
+            float(quote_size),
+            float(hedge_size),
+            float(cost),
+            float(src_close_price),
+            float(self.stop_loss),
+            float(self.paras["williams_lower"]),
+            float(self.paras["williams_upper"]),
+        )
+        if signal == STOP:
             self.logger.info("Stop loss triggered.")
+        elif signal == BUY:
+            self.logger.info("Buy signal.")
+        elif signal == SELL:
+            self.logger.info("Sell signal.")
+
+        if action == ROTATE:
             return self.move_position(
                 src_ticker=src_ticker,
                 dest_ticker=dest_ticker,
                 src_size=size,
-                dest_size=new_size,
+                dest_size=_size(expected_cash, dest_close_price),
             )
-
-        if (
-            quote_row["cmo_cross"] == 1
-            and quote_row["williams_r"] <= self.paras["williams_lower"]
-        ):
-            self.logger.info("Buy signal.")
-            if hedge_size > 0:
-                return self.move_position(
-                    src_ticker=src_ticker,
-                    dest_ticker=dest_ticker,
-                    src_size=size,
-                    dest_size=new_size,
-                )
-            elif quote_size == 0:
-                new_size = math.floor(expected_cash / quote_row["close"] * 0.95)
-                return [
-                    {
-                        "instrument": f"{self.quote_ticker}-USD-SPOT",
-                        "qty": new_size,
-                        "orderType": "MKT",
-                    }
-                ]
-        elif (
-            quote_row["cmo_cross"] == -1
-            and quote_row["williams_r"] >= self.paras["williams_upper"]
-        ):
-            self.logger.info("Sell signal.")
-            if quote_size > 0:
-                return self.move_position(
-                    src_ticker=src_ticker,
-                    dest_ticker=dest_ticker,
-                    src_size=size,
-                    dest_size=new_size,
-                )
-            elif hedge_size == 0:
-                new_size = math.floor(expected_cash / hedge_row["close"] * 0.95)
-                return [
-                    {
-                        "instrument": f"{self.hedge_ticker}-USD-SPOT",
-                        "qty": new_size,
-                        "orderType": "MKT",
-                    }
-                ]
+        elif action == BUY:
+            return [
+                {
+                    "instrument": self._instruments[quote_ticker],
+                    "qty": _size(expected_cash, quote_close),
+                    "orderType": "MKT",
+                }
+            ]
+        elif action == SELL:
+            return [
+                {
+                    "instrument": self._instruments[hedge_ticker],
+                    "qty": _size(expected_cash, hedge_close),
+                    "orderType": "MKT",
+                }
+            ]
         return []
 
 
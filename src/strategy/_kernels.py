@@ -0,0 +1,66 @@
+import numpy as np
+
+from ..utils._njit import njit
+
+
+# The kernels take explicit signatures so numba compiles them when this module is
+# imported (or loads them from the cache) instead of stalling the first tick. No
+# fastmath: the inputs carry NaN during indicator warm-up, and NaN comparisons must
+# stay False
+@njit("int8[:](float64[:], float64[:])", cache=True)
+def _crossover_kernel(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    out = np.zeros(a.size, dtype=np.int8)
+    if a.size == 0:
+        return out
+    prev = a[0] - b[0]
+    for i in range(1, a.size):
+        cur = a[i] - b[i]
+        if prev < 0 and cur > 0:
+            out[i] = 1
+        elif prev > 0 and cur < 0:
+            out[i] = -1
+        prev = cur
+    return out
+
+
+# Codes returned by _decide
+HOLD, BUY, SELL, STOP, ROTATE = 0, 1, 2, 3, 4
+
+
+@njit(
+    "UniTuple(int64, 2)(int64, float64, float64, float64, float64, float64, float64,"
+    " float64, float64)",
+    cache=True,
+)
+def _decide(
+    cmo_cross: int,
+    williams_r: float,
+    quote_size: float,
+    hedge_size: float,
+    cost: float,
+    src_price: float,
+    stop_loss: float,
+    williams_lower: float,
+    williams_upper: float,
+):
+    """
+    Evaluate the MomentWilliamsR signals of one tick. Returns (signal, action):
+    signal is HOLD, BUY, SELL or STOP, and action is HOLD, ROTATE (move the held
+    position to the other ticker), BUY (open the quote ticker) or SELL (open the
+    hedge ticker).
+    """
+    if cost > 0 and src_price / cost < 1 - stop_loss:
+        return STOP, ROTATE
+    if cmo_cross == 1 and williams_r <= williams_lower:
+        if hedge_size > 0:
+            return BUY, ROTATE
+        if quote_size == 0:
+            return BUY, BUY
+        return BUY, HOLD
+    if cmo_cross == -1 and williams_r >= williams_upper:
+        if quote_size > 0:
+            return SELL, ROTATE
+        if hedge_size == 0:
+            return SELL, SELL
+        return SELL, HOLD
+    return HOLD, HOLD
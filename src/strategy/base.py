@@ -7,6 +7,8 @@ import pandas as pd
 
 from src.broker.base import BrokerBase
 from src.grabber.base import DataGrabberBase
+from src.strategy._kernels import _crossover_kernel
+from src.utils._njit import NUMBA_AVAILABLE
 
 
 class Parameter:
@@ -23,7 +25,7 @@ class StrategyBase(abc.ABC):
     def __init__(self):
         self.cash_left = 0
         self.paras = {}
-        self.datas: pd.Series[pd.DataFrame] = pd.Series()
+        self.datas: Dict[str | int, pd.DataFrame] = dict()
         self.grabbers = dict()
         self.broker = None
         self.p = Parameter()
@@ -74,10 +76,7 @@ class StrategyBase(abc.ABC):
         self.grabbers[grabber.name] = grabber
 
     def addData(self, data: pd.DataFrame, name: str | None = None):
-        if name is None:
-            self.datas = pd.concat([self.datas, pd.Series({len(self.datas): data})])
-        else:
-            self.datas[name] = data
+        self.datas[len(self.datas) if name is None else name] = data
 
     def cross_over(self, data1: pd.Series, data2: pd.Series) -> pd.Series:
         """
@@ -92,10 +91,27 @@ class StrategyBase(abc.ABC):
                        no crossover, 1 indicates a upward crossover, and -1 indicates
                        a downward crossover.
         """
-
-        diff = data1 - data2
-        crossover = pd.Series(np.zeros(len(diff), dtype=int), index=diff.index)
-        crossover.iloc[0] = 0
-        crossover[(diff.shift(1) < 0) & (diff > 0)] = 1
-        crossover[(diff.shift(1) > 0) & (diff < 0)] = -1
+        return pd.Series(
+            self._crossOverArray(
+                np.ascontiguousarray(data1, dtype=np.float64),
+                np.ascontiguousarray(data2, dtype=np.float64),
+            ),
+            index=data1.index,
+        )
+
+    @staticmethod
+    def _crossOverArray(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        cross_over on contiguous float64 arrays, returning an int8 array.
+        """
+        if NUMBA_AVAILABLE:
+            return _crossover_kernel(a, b)
+
+        # Without numba the kernel would be a Python loop; use array ops instead
+        diff = a - b
+        prev, cur = diff[:-1], diff[1:]
+        crossover = np.zeros(len(diff), dtype=np.int8)
+        crossover[1:] = np.where(
+            (prev < 0) & (cur > 0), 1, np.where((prev > 0) & (cur < 0), -1, 0)
+        )
         return crossover
@@ -1,27 +1,39 @@
 import math
+from typing import Dict, List, Tuple
 
 import backtrader as bt
+import numpy as np
+import pandas as pd
 
 
 class MomentumWilliamsStrategy(bt.Strategy):
+    # Filled lengths of the order and trade records, set in __init__
+    _order_i: int
+    _trade_i: int
+
     # 交易紀錄
     def notify_order(self, order: bt.order.OrderData):
         if order.status == order.Completed:
-            time = bt.num2date(order.executed.dt)
-            self.trade_record["Time"].append(time)
-            if order.isbuy():
-                self.trade_record["Type"].append("Buy")
-            elif order.issell():
-                self.trade_record["Type"].append("Sell")
-            self.trade_record["Price"].append(order.executed.price)
-            self.trade_record["Amount"].append(order.executed.size)
-            self.trade_record["Commission"].append(order.executed.comm)
-            self.trade_record["Gross Pnl"].append(order.executed.pnl)
+            i = self._order_i
+            if i == len(self._order_price):
+                self._growOrderRecord()
+            self._order_time[i] = order.executed.dt
+            self._order_type[i] = 1 if order.isbuy() else -1 if order.issell() else 0
+            self._order_price[i] = order.executed.price
+            self._order_amount[i] = order.executed.size
+            self._order_comm[i] = order.executed.comm
+            self._order_pnl[i] = order.executed.pnl
+            self._order_i = i + 1
 
     def notify_trade(self, trade=bt.trade.Trade):
         if trade.isclosed:
-            self.trade_record["Net Pnl"].append(trade.pnlcomm)
-            self.trade_record["Value"].append(self.broker.get_value())
+            i = self._trade_i
+            if i == len(self._trade_pnl):
+                self._trade_pnl = np.resize(self._trade_pnl, 2 * i)
+                self._trade_value = np.resize(self._trade_value, 2 * i)
+            self._trade_pnl[i] = trade.pnlcomm
+            self._trade_value[i] = self.broker.get_value()
+            self._trade_i = i + 1
 
     params = dict(
         momentum_period=10,
@@ -33,6 +45,9 @@ class MomentumWilliamsStrategy(bt.Strategy):
         stop_loss=0.1,
         take_profit=0.3,
         bolling_period=10 * 5,
+        # Output of precompute_indicators(); replaces the momentum crossover and
+        # Williams %R indicators with arrays shared across a parameter sweep
+        indicator_cache=None,
     )
 
     def __init__(self):
@@ -43,17 +58,30 @@ class MomentumWilliamsStrategy(bt.Strategy):
         self.ini_cash = self.broker.get_cash()
 
         # Indicators
-        self.momentum = bt.ind.MomentumOscillator(
-            self.quote_data, period=int(self.p.momentum_period)
-        )
-        self.momentum_ma = bt.ind.MovingAverageSimple(
-            self.momentum, period=int(self.p.momentum_ma_period)
-        )
-        self.momentum_crossover = bt.ind.CrossOver(self.momentum, self.momentum_ma)
-        self.momentum_diff = self.momentum - self.momentum_ma
-        self.williams_r = bt.ind.WilliamsR(
-            self.quote_data, period=int(self.p.williams_period)
-        )
+        if self.p.indicator_cache is None:
+            self._crossover_arr = self._williams_r_arr = None
+            self.momentum = bt.ind.MomentumOscillator(
+                self.quote_data, period=int(self.p.momentum_period)
+            )
+            self.momentum_ma = bt.ind.MovingAverageSimple(
+                self.momentum, period=int(self.p.momentum_ma_period)
+            )
+            self.momentum_crossover = bt.ind.CrossOver(self.momentum, self.momentum_ma)
+            self.momentum_diff = self.momentum - self.momentum_ma
+            self.williams_r = bt.ind.WilliamsR(
+                self.quote_data, period=int(self.p.williams_period)
+            )
+        else:
+            self._crossover_arr = self.p.indicator_cache[
+                (
+                    "momentum_cross",
+                    int(self.p.momentum_period),
+                    int(self.p.momentum_ma_period),
+                )
+            ]
+            self._williams_r_arr = self.p.indicator_cache[
+                ("williams_r", int(self.p.williams_period))
+            ]
         self.sma = bt.ind.SMA(period=int(self.p.sma_period))
         self.bolling_top = bt.ind.BollingerBands(
             self.quote_data, period=int(self.p.bolling_period)
@@ -64,19 +92,63 @@ class MomentumWilliamsStrategy(bt.Strategy):
         if self.hedge_data is not None:
             self.sma_hedge = bt.ind.SMA(self.hedge_data, period=int(self.p.sma_period))
 
-        # For trading record output
-        self.trade_record = {
-            "Time": [],
-            "Type": [],
-            "Price": [],
-            "Amount": [],
-            "Commission": [],
-            "Gross Pnl": [],
-            "Net Pnl": [0],
-            "Value": [self.broker.get_cash()],
+        # For trading record output. The data is preloaded, so its length bounds
+        # the number of bars; a bar completes at most two orders (close and buy)
+        n = 2 * max(self.quote_data.buflen(), 1)
+        self._order_i = 0
+        self._order_time = np.empty(n, dtype=np.float64)  # backtrader date numbers
+        self._order_type = np.empty(n, dtype=np.int8)  # 1 buy, -1 sell
+        self._order_price = np.empty(n, dtype=np.float64)
+        self._order_amount = np.empty(n, dtype=np.float64)
+        self._order_comm = np.empty(n, dtype=np.float64)
+        self._order_pnl = np.empty(n, dtype=np.float64)
+        self._trade_i = 1
+        self._trade_pnl = np.empty(n, dtype=np.float64)
+        self._trade_value = np.empty(n, dtype=np.float64)
+        self._trade_pnl[0] = 0
+        self._trade_value[0] = self.broker.get_cash()
+
+    def _growOrderRecord(self):
+        n = 2 * len(self._order_price)
+        for name in (
+            "_order_time",
+            "_order_type",
+            "_order_price",
+            "_order_amount",
+            "_order_comm",
+            "_order_pnl",
+        ):
+            setattr(self, name, np.resize(getattr(self, name), n))
+
+    @property
+    def trade_record(self) -> Dict[str, np.ndarray]:
+        """
+        The completed orders and the closed trades recorded so far. The order
+        fields are aligned with each other, and so are "Net Pnl" and "Value",
+        which start with the initial cash before any trade.
+        """
+        i, j = self._order_i, self._trade_i
+        return {
+            "Time": np.array(
+                [bt.num2date(dt) for dt in self._order_time[:i]], dtype=object
+            ),
+            "Type": np.where(self._order_type[:i] == 1, "Buy", "Sell"),
+            "Price": self._order_price[:i],
+            "Amount": self._order_amount[:i],
+            "Commission": self._order_comm[:i],
+            "Gross Pnl": self._order_pnl[:i],
+            "Net Pnl": self._trade_pnl[:j],
+            "Value": self._trade_value[:j],
         }
 
     def next(self):
+        if self._crossover_arr is None:
+            crossover = self.momentum_crossover[0]
+            williams_r = self.williams_r[0]
+        else:
+            i = len(self.quote_data) - 1
+            crossover = self._crossover_arr[i]
+            williams_r = self._williams_r_arr[i]
 
         if self.hedge_data is None:
             close_price = self.quote_data.close[0]
@@ -108,18 +180,12 @@ class MomentumWilliamsStrategy(bt.Strategy):
                     print(f"{self.quote_data.datetime.datetime(0)}\tTake profit.")
                     return self.close()
 
-            if (
-                self.momentum_crossover == 1
-                and self.williams_r[0] <= self.p.williams_lower
-            ):
+            if crossover == 1 and williams_r <= self.p.williams_lower:
                 if self.position.size < 0:
                     return self.buy(size=abs(self.position.size) + new_size)
                 elif self.position.size == 0:
                     return self.buy()
-            elif (
-                self.momentum_crossover == -1
-                and self.williams_r[0] >= self.p.williams_upper
-            ):
+            elif crossover == -1 and williams_r >= self.p.williams_upper:
                 if self.position.size > 0:
                     return self.sell(size=abs(self.position.size) + new_size)
                 elif self.position.size == 0:
@@ -140,7 +206,9 @@ class MomentumWilliamsStrategy(bt.Strategy):
                         expected_cash / self.hedge_data.close[0] * 0.95
                     )
                     print(f"{self.quote_data.datetime.datetime(0)}\tStop loss.")
-                    return self.close(data=self.quote_data), self.buy(data=self.hedge_data, size=new_size)
+                    return self.close(data=self.quote_data), self.buy(
+                        data=self.hedge_data, size=new_size
+                    )
                 elif self.quote_data.close[0] / quote_price > (1 + self.p.take_profit):
                     print(f"{self.quote_data.datetime.datetime(0)}\tTake profit.")
                     return self.close(data=self.quote_data)
@@ -155,36 +223,36 @@ class MomentumWilliamsStrategy(bt.Strategy):
                         expected_cash / self.quote_data.close[0] * 0.95
                     )
                     print(f"{self.hedge_data.datetime.datetime(0)}\tStop loss.")
-                    return self.close(data=self.hedge_data), self.buy(data=self.quote_data, size=new_size)
+                    return self.close(data=self.hedge_data), self.buy(
+                        data=self.quote_data, size=new_size
+                    )
 
                 elif self.hedge_data.close[0] / hedge_price > (1 + self.p.take_profit):
                     print(f"{self.hedge_data.datetime.datetime(0)}\tTake profit.")
                     return self.close(data=self.hedge_data)
 
-            if (
-                self.momentum_crossover == 1
-                and self.williams_r[0] <= self.p.williams_lower
-            ):
+            if crossover == 1 and williams_r <= self.p.williams_lower:
                 expected_cash = min(
                     self.ini_cash,
                     hedge_size * self.hedge_data.close[0] + self.broker.get_cash(),
                 )
                 new_size = math.floor(expected_cash / self.quote_data.close[0] * 0.95)
                 if hedge_size > 0:
-                    return self.close(data=self.hedge_data), self.buy(data=self.quote_data, size=new_size)
+                    return self.close(data=self.hedge_data), self.buy(
+                        data=self.quote_data, size=new_size
+                    )
                 elif quote_size == 0 and hedge_size == 0:
                     return self.buy(data=self.quote_data, size=new_size)
-            elif (
-                self.momentum_crossover == -1
-                and self.williams_r[0] >= self.p.williams_upper
-            ):
+            elif crossover == -1 and williams_r >= self.p.williams_upper:
                 expected_cash = min(
                     self.ini_cash,
                     quote_size * self.quote_data.close[0] + self.broker.get_cash(),
                 )
                 new_size = math.floor(expected_cash / self.hedge_data.close[0] * 0.95)
                 if quote_size > 0:
-                    return self.close(data=self.quote_data), self.buy(data=self.hedge_data, size=new_size)
+                    return self.close(data=self.quote_data), self.buy(
+                        data=self.hedge_data, size=new_size
+                    )
                 elif quote_size == 0 and hedge_size == 0:
                     return self.buy(data=self.hedge_data, size=new_size)
 
@@ -195,3 +263,57 @@ class MomentumWilliamsStrategy(bt.Strategy):
         # trade_record_df.to_csv("result/momentum_williamsR.csv", index=False)
         print("End.")
         return self.close()
+
+
+def precompute_indicators(
+    data: pd.DataFrame, param_grid: List[dict]
+) -> Dict[tuple, np.ndarray]:
+    """
+    Compute the momentum crossover and Williams %R series needed by every parameter
+    set of a sweep once, so that each backtest run can read them by bar index
+    through the `indicator_cache` parameter instead of rebuilding the indicators.
+
+    Args:
+        data (pd.DataFrame): The quote data with high, low and close columns.
+        param_grid (List[dict]): The strategy parameter sets of the sweep.
+
+    Returns:
+        Dict[tuple, np.ndarray]: Arrays keyed by
+            ("momentum_cross", momentum_period, momentum_ma_period) and
+            ("williams_r", williams_period), aligned with the rows of data.
+    """
+    data = data.rename(columns=str.lower)
+    close, high, low = data["close"], data["high"], data["low"]
+    defaults = dict(MomentumWilliamsStrategy.params._getpairs())
+
+    cache: Dict[Tuple[str | int, ...], np.ndarray] = dict()
+    for para in param_grid:
+        para = {**defaults, **para}
+        momentum_period = int(para["momentum_period"])
+        momentum_ma_period = int(para["momentum_ma_period"])
+        williams_period = int(para["williams_period"])
+
+        key: Tuple[str | int, ...] = (
+            "momentum_cross",
+            momentum_period,
+            momentum_ma_period,
+        )
+        if key not in cache:
+            momentum = 100.0 * close / close.shift(momentum_period)
+            diff = momentum - momentum.rolling(momentum_ma_period).mean()
+            # Same rule as bt.ind.CrossOver: compare with the last non-zero diff
+            last_nonzero = diff.mask(diff == 0).ffill().shift(1)
+            crossover = np.where(
+                (last_nonzero < 0) & (diff > 0),
+                1.0,
+                np.where((last_nonzero > 0) & (diff < 0), -1.0, 0.0),
+            )
+            crossover[diff.isna().to_numpy()] = np.nan
+            cache[key] = crossover
+
+        key = ("williams_r", williams_period)
+        if key not in cache:
+            highest = high.rolling(williams_period).max()
+            lowest = low.rolling(williams_period).min()
+            cache[key] = (-100.0 * (highest - close) / (highest - lowest)).to_numpy()
+    return cache
@@ -1,6 +1,3 @@
-import sys
-
-sys.path.append("src")
 import abc
 import datetime
 import logging
@@ -14,6 +11,17 @@ from src.strategy.base import StrategyBase
 
 
 class TraderBase(abc.ABC):
+    __slots__ = (
+        "tickers",
+        "sleep_interval",
+        "strategy",
+        "broker",
+        "grabbers",
+        "break_flag",
+        "buffer_time",
+        "logger",
+    )
+
     def __init__(self, tickers: List[str], sleep_interval: float, buffer_time: float):
         """
         Initialize the YourClassName instance with provided parameters.
@@ -127,6 +135,8 @@ class TraderBase(abc.ABC):
                 - (-1): Data was updated, but it's considered stale.
         """
         res = dict()
+        # One grabber at a time: YahooFinanceGrabber goes through yf.download, whose
+        # results live in module-global state, so concurrent calls can swap frames
         for name, grabber in self.grabbers.items():
             result = grabber.updateData(time)
             if result == 1:
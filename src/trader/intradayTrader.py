@@ -1,66 +1,86 @@
-import sys
+from datetime import datetime, timedelta
+from enum import Enum
 from typing import List
 
 from .base import TraderBase
 
 
+class UpdateResult(Enum):
+    FRESH = 1  # Every grabber has new data
+    NOTHING_NEW = 0  # The data was updated before
+    STALE = -1  # Some data is too old
+    RETRY = 2  # Some data is not refreshed yet
+
+
 class IntradayTrader(TraderBase):
+    __slots__ = ()
+
     def __init__(
         self, tickers: List[str], sleep_interval: float = 1, buffer_time: float = 5
     ):
         super().__init__(tickers, sleep_interval, buffer_time)
 
+    def _sleepUntilNextWindow(self, now: datetime) -> None:
+        """
+        Sleep until the next buffer window opens, one second past a minute.
+        """
+        next_tick = now.replace(second=1, microsecond=0)
+        if next_tick <= now:
+            next_tick += timedelta(minutes=1)
+        self.broker.sleep((next_tick - now).total_seconds())
+
+    def _pollData(self, now: datetime) -> UpdateResult:
+        results = set(self.updateData(now).values())
+        if results <= {1}:
+            return UpdateResult.FRESH
+        elif results == {0}:
+            return UpdateResult.NOTHING_NEW
+        elif -1 in results:
+            return UpdateResult.STALE
+        return UpdateResult.RETRY
+
+    def _executeStrategy(self) -> None:
+        self.broker.update()
+        try:
+            instructions = self.strategy.next()
+            for instr in instructions:
+                self.logger.info("New order instruction: %s", instr)
+                order = self.broker.placeStockOrder(**instr)
+                self.logger.info(order)
+        except Exception as e:
+            self.logger.error(e)
+
     def run(self) -> None:
+        broker = self.broker
+        buffer_time = self.buffer_time
+        shutdown = None
         while True:
             if self.break_flag:
                 break
 
-            now = self.broker.now()
-            self.logger.debug(f"Current time: {now}")
-            if now.hour == 20 and now.minute == 59:
+            now = broker.now()
+            self.logger.debug("Current time: %s", now)
+            if shutdown is None or shutdown.date() != now.date():
+                shutdown = now.replace(hour=20, minute=59, second=0, microsecond=0)
+            if shutdown <= now < shutdown + timedelta(minutes=1):
                 self.stop()
                 break
-            elif 0 < now.second <= self.buffer_time:
-                # Check if data is too old
-                skip_flag = False
-                stale_flag = False
-                while True:
-                    if skip_flag:
-                        break
-                    res = self.updateData(now)
-                    # Update new data
-                    if all([x == 1 for x in res.values()]):
-                        break
-                    # Data is updated before
-                    elif all([x == 0 for x in res.values()]):
-                        skip_flag = True
-                        break
-                    for result in res.values():
-                        if result == -1:
-                            skip_flag = True
-                            stale_flag = True
-                        else:
-                            skip_flag = True
-                            self.broker.sleep(0.3)
-
-                if stale_flag:
-                    self.broker.sleep(50)  # Need to be adjusted
-                if skip_flag:
-                    self.broker.sleep(self.sleep_interval)
-                    continue
-
-                self.broker.update()
-                try:
-                    instructions = self.strategy.next()
-                    for instr in instructions:
-                        self.logger.info(f"New order instruction: {instr}")
-                        order = self.broker.placeStockOrder(**instr)
-                        self.logger.info(order)
-                except Exception as e:
-                    self.logger.error(e)
+            elif 0 < now.second <= buffer_time:
+                match self._pollData(now):
+                    case UpdateResult.FRESH:
+                        self._executeStrategy()
+                    case UpdateResult.STALE:
+                        broker.sleep(50)  # Need to be adjusted
+                        continue
+                    case UpdateResult.RETRY:
+                        broker.sleep(self.sleep_interval)
+                        continue
+                    case UpdateResult.NOTHING_NEW:
+                        pass
             else:
-                self.logger.debug(f"Not now.")
-            self.broker.sleep(self.run_interval)
+                self.logger.debug("Not now.")
+            # Nothing to do until the next window instead of polling every second
+            self._sleepUntilNextWindow(broker.now())
 
     def stop(self) -> None:
         self.broker.closePosition(self.tickers)
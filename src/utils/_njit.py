@@ -0,0 +1,22 @@
+"""
+Optional numba support. When numba is not installed, njit falls back to a no-op
+decorator and prange to range, so the decorated functions still run as plain
+Python.
+"""
+
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba is optional
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
@@ -1,39 +1,64 @@
+import functools
+import io
+import json
 import os
 from datetime import datetime
+from typing import Dict, List, Tuple
 
-import numpy as np
 import pandas as pd
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.http import MediaIoBaseDownload
 
 CRED_DIR = "./credentials/google"
 
 
+@functools.lru_cache(maxsize=None)
+def _load_creds(name: str, scopes: Tuple[str, ...]) -> Credentials:
+    """
+    Load the saved token of name, refreshing it or running the authorization flow
+    when needed. The result is cached, so several operators of the same name and
+    scopes share one credential.
+    """
+    token_path = os.path.join(CRED_DIR, f"{name}_token.json")
+    saved = None
+    creds = None
+    if os.path.exists(token_path):
+        with open(token_path) as token:
+            saved = token.read()
+        creds = Credentials.from_authorized_user_info(json.loads(saved))
+        # A token saved with fewer scopes has to be authorized again
+        if not set(scopes) <= set(creds.scopes or []):
+            creds = None
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(
+                os.path.join(CRED_DIR, f"{name}.json"), list(scopes)
+            )
+            creds = flow.run_local_server(port=0)
+        # Save the credentials for the next run, unless nothing changed
+        new_token = creds.to_json()
+        if new_token != saved:
+            with open(token_path, "w") as token:
+                token.write(new_token)
+    return creds
+
+
 class GoogleCalendarOperator:
     def __init__(self, name: str = ""):
         # Please follow this guide to create a credential file first:
         # https://developers.google.com/calendar/api/quickstart/python
 
-        SCOPES = ["https://www.googleapis.com/auth/calendar"]
-        creds = None
-        if os.path.exists(os.path.join(CRED_DIR, f"{name}_token.json")):
-            creds = Credentials.from_authorized_user_file(
-                os.path.join(CRED_DIR, f"{name}_token.json"), SCOPES
-            )
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    os.path.join(CRED_DIR, f"{name}.json"), SCOPES
-                )
-                creds = flow.run_local_server(port=0)
-            # Save the credentials for the next run
-            with open(os.path.join(CRED_DIR, f"{name}_token.json"), "w") as token:
-                token.write(creds.to_json())
+        SCOPES: tuple[str, ...] = ("https://www.googleapis.com/auth/calendar",)
+        creds = _load_creds(name, SCOPES)
         self.service = build("calendar", "v3", credentials=creds)
+        # (summary, id) of every calendar, fetched on the first id lookup
+        self._calendars: List[Tuple[str, str]] | None = None
+        self._calendar_ids: Dict[str, str] = dict()
 
     def list_calendars(self):
         page_token = None
@@ -54,77 +79,158 @@ class GoogleCalendarOperator:
             if not page_token:
                 break
 
-    def get_calendar_id(self, calendar_name: str) -> str:
+    def refresh_calendars(self) -> List[Tuple[str, str]]:
+        """
+        Fetch the calendar list again, e.g. after calendars were added or renamed,
+        and return its (summary, id) pairs.
+        """
+        calendars = []
         page_token = None
         while True:
             calendar_list = (
                 self.service.calendarList().list(pageToken=page_token).execute()
             )
             for calendar_list_entry in calendar_list["items"]:
-                if calendar_name in calendar_list_entry["summary"]:
-                    return str(calendar_list_entry["id"])
+                calendars.append(
+                    (calendar_list_entry["summary"], str(calendar_list_entry["id"]))
+                )
             page_token = calendar_list.get("nextPageToken")
             if not page_token:
                 break
+        self._calendars = calendars
+        self._calendar_ids.clear()
+        return calendars
+
+    def get_calendar_id(self, calendar_name: str) -> str:
+        """
+        Return the id of the first calendar whose summary contains calendar_name.
+        The calendar list is fetched once and kept; a name that is not found
+        triggers one refetch before giving up.
+        """
+        if calendar_name in self._calendar_ids:
+            return self._calendar_ids[calendar_name]
+        fetched = self._calendars is None
+        while True:
+            calendars = self._calendars
+            if calendars is None:
+                calendars = self.refresh_calendars()
+            for summary, calendar_id in calendars:
+                if calendar_name in summary:
+                    self._calendar_ids[calendar_name] = calendar_id
+                    return calendar_id
+            if fetched:
+                break
+            self._calendars = None
+            fetched = True
         raise ValueError(
             "Cannot find calendar id. Please provide correct calendar name."
         )
 
-    def create_event_execute(self, calendar_id: str, event: dict):
+    def create_event_execute(self, calendar_id: str, event: dict) -> dict:
+        """
+        Insert event into the calendar and return the created event. Errors are
+        raised; see create_event_execute_safe() for the non-raising form.
+        """
+        request = self.service.events().insert(calendarId=calendar_id, body=event)
+        created: dict = request.execute()
+        return created
+
+    def create_event_execute_safe(self, calendar_id: str, event: dict):
+        """
+        Same as create_event_execute(), but returns "" on success and the exception
+        on failure instead of raising.
+        """
         try:
-            self.service.events().insert(calendarId=calendar_id, body=event).execute()
+            self.create_event_execute(calendar_id, event)
             return ""
         except Exception as e:
             return e
 
-    def create_event(
-        self,
-        calendar: str,
+    @staticmethod
+    def _event_body(
         title: str,
         start: datetime,
         end: datetime,
         detail: str = "",
         timezone: str = "UTC",
-    ):
-        calendar_id = self.get_calendar_id(calendar)
-        event = {
+    ) -> dict:
+        # Wall-clock time without offset, the zone is given by timeZone
+        return {
             "summary": title,
             "description": detail,
             "start": {
-                "dateTime": start.strftime("%Y-%m-%dT%H:%M:%S"),
+                "dateTime": start.replace(tzinfo=None).isoformat(timespec="seconds"),
                 "timeZone": timezone,
             },
             "end": {
-                "dateTime": end.strftime("%Y-%m-%dT%H:%M:%S"),
+                "dateTime": end.replace(tzinfo=None).isoformat(timespec="seconds"),
                 "timeZone": timezone,
             },
         }
+
+    def create_event(
+        self,
+        calendar: str,
+        title: str,
+        start: datetime,
+        end: datetime,
+        detail: str = "",
+        timezone: str = "UTC",
+    ):
+        calendar_id = self.get_calendar_id(calendar)
+        event = self._event_body(title, start, end, detail, timezone)
         return self.create_event_execute(calendar_id, event)
 
+    def create_events_bulk(
+        self, calendar: str, events: List[dict]
+    ) -> list[str | Exception]:
+        """
+        Create many events with batch requests, 50 inserts per HTTP round trip.
+
+        Args:
+            calendar (str): The calendar name, as for create_event().
+            events (List[dict]): The keyword arguments of create_event() for each
+                event: title, start, end, and optionally detail and timezone.
+
+        Returns:
+            list[str | Exception]: For each event, "" if it was created or the
+                exception raised.
+        """
+        calendar_id = self.get_calendar_id(calendar)
+        results: list[str | Exception] = [""] * len(events)
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                results[int(request_id)] = exception
+
+        for offset in range(0, len(events), 50):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for i, event in enumerate(events[offset : offset + 50], offset):
+                batch.add(
+                    self.service.events().insert(
+                        calendarId=calendar_id, body=self._event_body(**event)
+                    ),
+                    request_id=str(i),
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                results[offset : offset + 50] = [e] * len(events[offset : offset + 50])
+        return results
+
 
 class GoogleSheetOperator:
-    def __init__(self, name: str = ""):
+    def __init__(self, name: str = "", drive: bool = False):
         # Please follow this guide to create a credential file first:
         # https://developers.google.com/sheets/api/quickstart/python
+        # drive adds read access to Drive, needed by get_sheet_csv()
 
-        SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-        creds = None
-        if os.path.exists(os.path.join(CRED_DIR, f"{name}_token.json")):
-            creds = Credentials.from_authorized_user_file(
-                os.path.join(CRED_DIR, f"{name}_token.json"), SCOPES
-            )
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    os.path.join(CRED_DIR, f"{name}.json"), SCOPES
-                )
-                creds = flow.run_local_server(port=0)
-            # Save the credentials for the next run
-            with open(os.path.join(CRED_DIR, f"{name}_token.json"), "w") as token:
-                token.write(creds.to_json())
+        SCOPES: tuple[str, ...] = ("https://www.googleapis.com/auth/spreadsheets",)
+        if drive:
+            SCOPES += ("https://www.googleapis.com/auth/drive.readonly",)
+        creds = _load_creds(name, SCOPES)
         self.service = build("sheets", "v4", credentials=creds)
+        self._drive = build("drive", "v3", credentials=creds) if drive else None
 
     def get_sheet(self, sheet_id, range_name, **kwargs):
         res = (
@@ -135,6 +241,18 @@ class GoogleSheetOperator:
         )
         return res.get("values", [])
 
+    def get_sheets(self, sheet_id, range_names: List[str], **kwargs) -> list:
+        """
+        Same as get_sheet() for several ranges, read in one batchGet request.
+        """
+        res = (
+            self.service.spreadsheets()
+            .values()
+            .batchGet(spreadsheetId=sheet_id, ranges=range_names, **kwargs)
+            .execute()
+        )
+        return [value_range.get("values", []) for value_range in res["valueRanges"]]
+
     def get_sheet_df(self, sheet_id, range_name, header: int = 0, **kwargs):
         df = pd.DataFrame(self.get_sheet(sheet_id, range_name, **kwargs))
         if header >= 0:
@@ -142,6 +260,28 @@ class GoogleSheetOperator:
             df = df.drop(header)
         return df
 
+    def get_sheet_csv(self, sheet_id, **kwargs) -> pd.DataFrame:
+        """
+        Read the first sheet of a spreadsheet through the Drive CSV export and
+        parse it with pd.read_csv(**kwargs). This is much faster than
+        get_sheet_df() on large sheets, but needs the operator created with
+        drive=True and is limited to exports of 10 MB.
+        """
+        if self._drive is None:
+            raise ValueError(
+                "Drive access is not enabled. Please create with drive=True."
+            )
+        buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(
+            buffer,
+            self._drive.files().export_media(fileId=sheet_id, mimeType="text/csv"),
+        )
+        done = False
+        while not done:
+            _, done = downloader.next_chunk()
+        buffer.seek(0)
+        return pd.read_csv(buffer, **kwargs)
+
     def update_sheet(
         self, sheet_id, range_name, values, input_option: str = "USER_ENTERED", **kwargs
     ):
@@ -160,6 +300,32 @@ class GoogleSheetOperator:
         )
         return result
 
+    def update_sheets(
+        self,
+        sheet_id,
+        range_values: Dict[str, list],
+        input_option: str = "USER_ENTERED",
+        **kwargs,
+    ):
+        """
+        Same as update_sheet() for several ranges, written in one batchUpdate
+        request. range_values maps each range name to its values.
+        """
+        body = {
+            "valueInputOption": input_option,
+            "data": [
+                {"range": range_name, "values": values}
+                for range_name, values in range_values.items()
+            ],
+        }
+        result = (
+            self.service.spreadsheets()
+            .values()
+            .batchUpdate(spreadsheetId=sheet_id, body=body, **kwargs)
+            .execute()
+        )
+        return result
+
     def update_sheet_df(
         self,
         sheet_id,
@@ -169,13 +335,21 @@ class GoogleSheetOperator:
         input_option: str = "USER_ENTERED",
         **kwargs,
     ):
-        df = df.replace(np.nan, "")
-        values = df.values.tolist()
+        # One pass that fills NaN with empty cells while building the object array
+        values = df.to_numpy(dtype=object, na_value="").tolist()
         if header:
-            values = [df.columns.to_list()] + values
+            values.insert(0, df.columns.to_list())
         return self.update_sheet(sheet_id, range_name, values, input_option, **kwargs)
 
     def clear_sheet(self, sheet_id, range_name, **kwargs) -> None:
         self.service.spreadsheets().values().clear(
             spreadsheetId=sheet_id, range=range_name, body={}, **kwargs
         ).execute()
+
+    def clear_sheets(self, sheet_id, range_names: List[str], **kwargs) -> None:
+        """
+        Same as clear_sheet() for several ranges, cleared in one batchClear request.
+        """
+        self.service.spreadsheets().values().batchClear(
+            spreadsheetId=sheet_id, body={"ranges": range_names}, **kwargs
+        ).execute()
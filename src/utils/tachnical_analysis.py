@@ -1,5 +1,92 @@
+import numpy as np
 import pandas as pd
 
+from ._njit import NUMBA_AVAILABLE, njit, prange
+
+
+# No fastmath: the NaN checks below must not be optimized away
+@njit(
+    "UniTuple(float64[:], 3)(float64[:], float64, float64, float64)",
+    cache=True,
+)
+def _macd_kernel(
+    close: np.ndarray, alpha_fast: float, alpha_slow: float, alpha_signal: float
+):
+    """
+    MACD of close in one pass, with ewm(adjust=False, ignore_na=True) recurrences.
+    Leading NaN close prices give NaN; later ones repeat the previous values, and
+    the EMAs resume from them as if the gap were not there.
+    """
+    n = close.size
+    macd = np.full(n, np.nan)
+    signal = np.full(n, np.nan)
+    histogram = np.full(n, np.nan)
+    started = False
+    ema_fast = ema_slow = sig = 0.0
+    for i in range(n):
+        x = close[i]
+        if np.isnan(x):
+            if started:
+                macd[i] = ema_fast - ema_slow
+                signal[i] = sig
+                histogram[i] = macd[i] - sig
+            continue
+        if started:
+            ema_fast += alpha_fast * (x - ema_fast)
+            ema_slow += alpha_slow * (x - ema_slow)
+            sig += alpha_signal * (ema_fast - ema_slow - sig)
+        else:
+            ema_fast = ema_slow = x
+            sig = 0.0
+            started = True
+        macd[i] = ema_fast - ema_slow
+        signal[i] = sig
+        histogram[i] = macd[i] - sig
+    return macd, signal, histogram
+
+
+@njit(
+    "UniTuple(float64[:, :], 3)(float64[:, :], float64, float64, float64)",
+    cache=True,
+    parallel=True,
+)
+def _macd_kernel_2d(
+    close: np.ndarray, alpha_fast: float, alpha_slow: float, alpha_signal: float
+):
+    """
+    _macd_kernel on every column of close, the columns spread across cores.
+    """
+    macd = np.empty_like(close)
+    signal = np.empty_like(close)
+    histogram = np.empty_like(close)
+    for j in prange(close.shape[1]):
+        m, sig, hist = _macd_kernel(close[:, j], alpha_fast, alpha_slow, alpha_signal)
+        macd[:, j] = m
+        signal[:, j] = sig
+        histogram[:, j] = hist
+    return macd, signal, histogram
+
+
+def _macd_pandas(close, fastperiod: int, slowperiod: int, signalperiod: int) -> tuple:
+    """
+    MACD of a close Series or DataFrame with pandas, giving the same result as
+    _macd_kernel.
+    """
+    # ignore_na=True to match _macd_kernel: gaps neither decay nor reweight the
+    # EMAs, so results do not depend on whether numba is installed
+    ema_fast = close.ewm(span=fastperiod, adjust=False, ignore_na=True).mean()
+    ema_slow = close.ewm(span=slowperiod, adjust=False, ignore_na=True).mean()
+    macd = ema_fast - ema_slow
+    # ewm carries the EMAs through NaN closes, so macd has values there; the
+    # kernel does not move the signal line on those rows, so they are masked out
+    signal = (
+        macd.where(close.notna())
+        .ewm(span=signalperiod, adjust=False, ignore_na=True)
+        .mean()
+    )
+    histogram = macd - signal
+    return macd, signal, histogram
+
 
 class TachnicalAnalysis:
     def __init__(self, yf_data: pd.DataFrame) -> None:
@@ -9,9 +96,37 @@ class TachnicalAnalysis:
     def MACD(
         self, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9
     ) -> tuple:
-        ema_fast = self.stock_data["Close"].ewm(span=fastperiod, adjust=False).mean()
-        ema_slow = self.stock_data["Close"].ewm(span=slowperiod, adjust=False).mean()
-        macd = ema_fast - ema_slow
-        signal = macd.ewm(span=signalperiod, adjust=False).mean()
-        histogram = macd - signal
-        return macd, signal, histogram
+        # A frame with one column per ticker when the data holds several tickers
+        close = self.data["Close"]
+        if NUMBA_AVAILABLE:
+            alphas = (
+                2 / (fastperiod + 1),
+                2 / (slowperiod + 1),
+                2 / (signalperiod + 1),
+            )
+            if isinstance(close, pd.DataFrame):
+                # Column-major, so each ticker's prices are contiguous
+                return tuple(
+                    pd.DataFrame(values, index=close.index, columns=close.columns)
+                    for values in _macd_kernel_2d(
+                        np.asfortranarray(close, dtype=np.float64), *alphas
+                    )
+                )
+            return tuple(
+                pd.Series(values, index=close.index)
+                for values in _macd_kernel(
+                    np.ascontiguousarray(close, dtype=np.float64), *alphas
+                )
+            )
+
+        return _macd_pandas(close, fastperiod, slowperiod, signalperiod)
+
+
+if __name__ == "__main__":
+    # The numba and pandas paths must agree, including across NaN gaps in Close
+    close = pd.Series(np.linspace(100.0, 130.0, 80) + np.sin(np.arange(80)))
+    close.iloc[[0, 1, 10, 11, 12, 40, 79]] = np.nan
+    kernel = _macd_kernel(close.to_numpy(), 2 / 13, 2 / 27, 2 / 10)
+    for actual, expected in zip(kernel, _macd_pandas(close, 12, 26, 9)):
+        np.testing.assert_allclose(actual, expected.to_numpy())
+    print("MACD kernel and pandas fallback agree.")
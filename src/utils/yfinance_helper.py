@@ -1,42 +1,90 @@
-from datetime import datetime, timedelta
+import hashlib
+import os
+import time
+from datetime import date, datetime, timedelta
 
 import pandas as pd
 import yfinance as yf
 
+YF_CACHE_DIR = ".yf_cache"
+# Longest date range yfinance serves per request, for the intraday intervals
+_CHUNK_DAYS = {
+    "1m": 7,
+    "2m": 60,
+    "5m": 60,
+    "15m": 60,
+    "30m": 60,
+    "90m": 60,
+    "60m": 730,
+    "1h": 730,
+}
+
+
+def yf_cached_download(
+    tickers, period: str, interval: str, ttl: float = 3600, **kwargs
+) -> pd.DataFrame:
+    """
+    Same as yf.download(tickers, period=period, interval=interval, **kwargs), but
+    the result is kept as a parquet file under YF_CACHE_DIR and reused for `ttl`
+    seconds, so repeated backtests do not download the same data again.
+    """
+    ticker_key = tickers if isinstance(tickers, str) else ",".join(tickers)
+    key = f"{ticker_key}-{period}-{interval}-{sorted(kwargs.items())}"
+    file_path = os.path.join(
+        YF_CACHE_DIR, f"{hashlib.md5(key.encode()).hexdigest()}.parquet"
+    )
+    if os.path.isfile(file_path) and time.time() - os.path.getmtime(file_path) < ttl:
+        return pd.read_parquet(file_path)
+    data = yf.download(tickers, period=period, interval=interval, **kwargs)
+    # yfinance returns an empty frame when the download fails; do not cache that
+    if data.empty:
+        return data
+    os.makedirs(YF_CACHE_DIR, exist_ok=True)
+    data.to_parquet(file_path)
+    return data
+
+
+def _as_datetime(value) -> datetime | None:
+    # "YYYY-MM-DD" strings, dates or datetimes; None for anything else
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return None
+
 
 def yf_download(tickers, start=None, end=None, interval="1d", **kwargs):
     if start is not None:
-        end = datetime.now() if end is None else datetime.strptime(end, "%Y-%m-%d")
-        if isinstance(start, str):
-            start = datetime.strptime(start, "%Y-%m-%d")
-        elif not isinstance(start, datetime):
+        start = _as_datetime(start)
+        if start is None:
             return pd.DataFrame()
+        end = datetime.now() if end is None else _as_datetime(end)
 
-        if interval in {"1m"}:
-            time_list = [
-                (x, x + timedelta(days=7))
-                for x in pd.date_range(start=start, end=end, freq="7D")
-            ]
-        elif interval in {"2m", "5m", "15m", "30m", "90m"}:
-            time_list = [
-                (x, x + timedelta(days=60))
-                for x in pd.date_range(start=start, end=end, freq="60D")
-            ]
-        elif interval in {"60m", "1h"}:
-            time_list = [
-                (x, x + timedelta(days=730))
-                for x in pd.date_range(start=start, end=end, freq="730D")
-            ]
-        else:
+        chunk_days = _CHUNK_DAYS.get(interval)
+        if chunk_days is None:
             time_list = [(start, end)]
+        else:
+            step = timedelta(days=chunk_days)
+            # yfinance treats end as exclusive, so the chunks run to the day after
+            # end to include its bars, e.g. today's when end defaults to now
+            stop = datetime.combine(end.date() + timedelta(days=1), datetime.min.time())
+            time_list = []
+            chunk_start = start
+            while chunk_start < stop:
+                time_list.append((chunk_start, min(chunk_start + step, stop)))
+                chunk_start += step
 
+        # One chunk at a time: yf.download keeps its results in module-global state,
+        # so concurrent calls can return each other's frames
         res = [
             yf.download(
                 tickers,
-                start=start.strftime("%Y-%m-%d"),
-                end=end.strftime("%Y-%m-%d"),
+                start=start.date().isoformat(),
+                end=end.date().isoformat(),
                 interval=interval,
-                **kwargs
+                **kwargs,
             )
             for (start, end) in time_list
         ]
@@ -44,8 +92,8 @@ def yf_download(tickers, start=None, end=None, interval="1d", **kwargs):
     else:
         res = [yf.download(tickers, start=start, end=end, interval=interval, **kwargs)]
 
-    return (
-        pd.concat(res).sort_values("Datetime").drop_duplicates()
-        if len(res) > 0
-        else pd.DataFrame()
-    )
+    if len(res) == 0:
+        return pd.DataFrame()
+    # Adjacent chunks overlap on their boundary bars; the timestamp identifies a bar
+    data = pd.concat(res, copy=False)
+    return data[~data.index.duplicated(keep="first")].sort_index()